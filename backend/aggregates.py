@@ -0,0 +1,143 @@
+'''
+Read access to the county/day aggregates which frontend/etl.py writes to data-cases.
+
+The county arrays are memory-mapped and the sums per Bundesland computed once per load, so every request only
+slices them.
+'''
+import bisect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+REPO_DIR = os.environ.get('REPO_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+COUNTY_DAY_INDEX_PATH = os.path.join(REPO_DIR, 'data-cases', 'county_day_index.json')
+STATE_MARKERS_PATH = os.path.join(REPO_DIR, 'frontend', 'county_centers', 'bundeslaender_marker.json')
+
+LEVELS = ['bundesland', 'landkreis']
+
+
+def file_signature(path):
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+def load_county_day_arrays(index_path):
+    '''
+    The index etl.py wrote and the memory-mapped daily and cumulative county arrays of its generation.
+    '''
+    directory = os.path.dirname(index_path)
+    generation = None
+    while True:
+        with open(index_path, encoding='utf-8') as fid:
+            index = json.load(fid)
+        try:
+            daily, cumulative = [np.load(os.path.join(directory, index['arrays'][name]), mmap_mode='r')
+                                 for name in ['daily', 'cumulative']]
+            break
+        except FileNotFoundError:
+            # Retried only if a newer generation replaced the index and removed these arrays meanwhile.
+            if index['generation'] == generation:
+                raise
+            generation = index['generation']
+    shape = (index['shape'][0], len(index['counties']), len(index['metrics']))
+    if daily.shape != shape or cumulative.shape != shape:
+        raise ValueError(f'The arrays of {index_path} have the shapes {daily.shape} and {cumulative.shape} '
+                         f'instead of {shape}')
+    return index, daily, cumulative
+
+
+class Cases:
+    '''
+    Deaths and infected per day of every Bundesland and Landkreis, accumulated (deaths, infected) and new on the day
+    (new_deaths, new_infected), see fields.
+
+    The markers of a level (names, coordinates) do not change from day to day, see markers. A day holds the counts
+    of all markers in the same order, see day; a timeline the counts of one marker on all days, see timeline.
+    '''
+
+    def __init__(self, days, markers, metrics, daily, cumulative):
+        # Sorted YYYY-MM-DD strings, so date ranges are found by bisection.
+        self.days = days
+        self.markers = markers
+        self.metrics = metrics
+        # level -> array of shape (days, markers, metrics)
+        self.daily = daily
+        self.cumulative = cumulative
+        self.fields = list(metrics) + ['new_' + metric for metric in metrics]
+        self._day_to_index = {day: index for index, day in enumerate(days)}
+        self._name_to_index = {level: {name: index for index, name in enumerate(level_markers['name'])}
+                               for level, level_markers in markers.items()}
+
+    @classmethod
+    def load(cls, index_path=COUNTY_DAY_INDEX_PATH, state_markers_path=STATE_MARKERS_PATH):
+        index, county_daily, county_cumulative = load_county_day_arrays(index_path)
+        with open(state_markers_path, encoding='utf-8') as fid:
+            state_markers = json.load(fid)
+        days = pd.date_range(index['first_day'], periods=county_daily.shape[0]).strftime('%Y-%m-%d').tolist()
+
+        states = sorted(set(index['countries']))
+        state_index = pd.Categorical(index['countries'], categories=states).codes
+        daily, cumulative = {'landkreis': county_daily}, {'landkreis': county_cumulative}
+        for counties, summed in [(county_daily, daily), (county_cumulative, cumulative)]:
+            # Sums the counties of each Bundesland, (days, counties, metrics) -> (days, states, metrics).
+            state_values = np.zeros((counties.shape[0], len(states), counties.shape[2]), dtype=np.int64)
+            np.add.at(state_values, (slice(None), state_index), counties)
+            summed['bundesland'] = state_values
+
+        markers = {
+            'bundesland': {'name': states, 'country': states,
+                           'lat': [state_markers[state][0] for state in states],
+                           'lon': [state_markers[state][1] for state in states]},
+            'landkreis': {'name': index['counties'], 'country': index['countries'],
+                          'lat': index['lat'], 'lon': index['lon']},
+        }
+        return cls(days, markers, index['metrics'], daily, cumulative)
+
+    def day_range(self, start=None, end=None):
+        '''
+        The slice of days from start to end (YYYY-MM-DD, both included), of all days without them.
+        '''
+        return slice(0 if start is None else bisect.bisect_left(self.days, start),
+                     len(self.days) if end is None else bisect.bisect_right(self.days, end))
+
+    def values(self, level, field):
+        '''
+        The counts of field for all markers of level, of shape (days, markers).
+        '''
+        if field.startswith('new_'):
+            return self.daily[level][:, :, self.metrics.index(field[len('new_'):])]
+        return self.cumulative[level][:, :, self.metrics.index(field)]
+
+    def day(self, level, day, fields=None):
+        '''
+        The counts of all markers of level on day (YYYY-MM-DD), None for a day without data. The accumulated ones
+        unless fields are given.
+        '''
+        day_index = self._day_to_index.get(day)
+        if day_index is None:
+            return None
+        return {'day': day, **{field: self.values(level, field)[day_index].tolist()
+                               for field in fields or self.metrics}}
+
+    def days_between(self, level, fields=None, start=None, end=None):
+        '''
+        The counts of all markers of level on every day from start to end (YYYY-MM-DD, both included), per field a
+        list of days of which each lists the markers. The accumulated ones unless fields are given.
+        '''
+        days = self.day_range(start, end)
+        return {'days': self.days[days], **{field: self.values(level, field)[days].tolist()
+                                            for field in fields or self.metrics}}
+
+    def timeline(self, level, name, fields=None, start=None, end=None):
+        '''
+        The counts of the marker name of level from start to end (YYYY-MM-DD, both included), None for an unknown
+        marker. All fields unless fields are given.
+        '''
+        marker_index = self._name_to_index[level].get(name)
+        if marker_index is None:
+            return None
+        days = self.day_range(start, end)
+        return {'name': name, 'country': self.markers[level]['country'][marker_index], 'days': self.days[days],
+                **{field: self.values(level, field)[days, marker_index].tolist() for field in fields or self.fields}}
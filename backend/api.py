@@ -1,10 +1,18 @@
-from flask import Flask, Blueprint, url_for, session
-from flask_restplus import Api, Resource, fields,apidoc
+from flask import Flask, Blueprint, url_for, session, request
+from flask_restx import Api, Resource, fields, apidoc, inputs, reqparse
+from flask_compress import Compress
 from flask_cors import CORS
-import os, uuid
+import functools, hashlib, os, uuid
+from werkzeug.exceptions import HTTPException
+
+from aggregates import LEVELS
+from store import DataUnavailable, data_store
 
 app = Flask(__name__)
 CORS(app, supports_credentials=True)
+# Brotli where the client accepts it, small responses are not worth compressing.
+app.config.update(COMPRESS_ALGORITHM=['br', 'gzip'], COMPRESS_MIN_SIZE=1024)
+Compress(app)
 
 
 #if 'REVERSE_PROXY_REQUIRED' in os.environ:
@@ -18,6 +26,65 @@ api=Api(app,
         default_label=""
 )
 
+def response_etag(path, query_string, entries):
+    """
+    The strong ETag of the response to a GET of path with query_string, built from the data store entries, for their
+    current data.
+    """
+    return hashlib.sha1('{} {}?{}'.format(data_store.version(entries), path, query_string).encode()).hexdigest()
+
+
+def etag_entries(path):
+    """
+    The data store entries the response to a GET of path is built from, None if it has no ETag.
+    """
+    try:
+        endpoint, _ = app.url_map.bind('').match(path, method='GET')
+    except HTTPException:
+        return None
+    view_class = getattr(app.view_functions[endpoint], 'view_class', None)
+    return getattr(getattr(view_class, 'get', None), 'etag_entries', None)
+
+
+def matching_etag(if_none_match, etag):
+    """
+    The tag of the If-None-Match header which is etag, None if there is none.
+    """
+    # Compress appends the encoding to the ETag of compressed responses, e.g. "<etag>:br".
+    for tag in if_none_match.as_set():
+        if tag.split(':')[0] == etag:
+            return tag
+    return None
+
+
+def conditional(*entries):
+    """
+    Answers 304 Not Modified without calling get when the client already has the response for the current data of
+    the data store entries, else adds a strong ETag of their version and the URL to it.
+    """
+    def decorator(get):
+        @functools.wraps(get)
+        def wrapper(*args, **kwargs):
+            etag = response_etag(request.path, request.query_string.decode(), entries)
+            tag = matching_etag(request.if_none_match, etag)
+            if tag is not None:
+                not_modified = app.response_class(status=304)
+                not_modified.set_etag(tag)
+                return not_modified
+            return get(*args, **kwargs), 200, {'ETag': '"{}"'.format(etag), 'Cache-Control': 'no-cache'}
+        wrapper.etag_entries = entries
+        return wrapper
+    return decorator
+
+
+@api.errorhandler(DataUnavailable)
+def data_unavailable(error):
+    """
+    The aggregates are built by frontend/etl.py, which has not run yet or failed.
+    """
+    return {'message': 'The data is not available yet, {}. Run frontend/etl.py to build it.'.format(error)}, 503
+
+
 @api.route('/ping')
 class Ping(Resource):
     def get(self):
@@ -26,5 +93,135 @@ class Ping(Resource):
         """
         return {'ping':'PONG'}
 
+
+def iso_day(value):
+    return inputs.date_from_iso8601(value).isoformat()
+
+
+def split_fields(value):
+    return [field.strip() for field in value.split(',') if field.strip()]
+
+
+def selected_fields(requested, known):
+    """
+    The fields of the request, all known ones if none were asked for.
+    """
+    unknown = [field for field in requested or [] if field not in known]
+    if unknown:
+        api.abort(400, 'Unknown fields {}, known are {}'.format(', '.join(unknown), ', '.join(known)))
+    return requested
+
+
+fields_parser = reqparse.RequestParser()
+fields_parser.add_argument('fields', type=split_fields, help='Comma-separated fields to return, all by default')
+
+range_parser = fields_parser.copy()
+range_parser.add_argument('from', type=iso_day, dest='start', help='First day (YYYY-MM-DD) to return')
+range_parser.add_argument('to', type=iso_day, dest='end', help='Last day (YYYY-MM-DD) to return')
+
+measures_parser = range_parser.copy()
+measures_parser.add_argument('location', help='Bundesland of the measures')
+measures_parser.add_argument('zielgruppe', action='append',
+                             help='Target group, repeat it for measures targeting any of several ones')
+
+
+def check_level(level):
+    if level not in LEVELS:
+        api.abort(404, 'Unknown level {}'.format(level))
+
+
+@api.route('/map/<string:level>')
+@api.doc(params={'level': 'bundesland or landkreis'})
+class MapMarkers(Resource):
+    @conditional('cases')
+    def get(self, level):
+        """
+        The days with data and the markers of the map, which are the same on every day
+        """
+        check_level(level)
+        cases = data_store.get('cases')
+        return {'days': cases.days, 'markers': cases.markers[level]}
+
+
+@api.route('/map/<string:level>/<string:day>')
+@api.doc(params={'level': 'bundesland or landkreis', 'day': 'YYYY-MM-DD'})
+class MapDay(Resource):
+    @api.expect(fields_parser)
+    @conditional('cases')
+    def get(self, level, day):
+        """
+        Accumulated deaths and infected (or the fields asked for) of every marker on one day, in the order of the
+        markers
+        """
+        check_level(level)
+        cases = data_store.get('cases')
+        requested = selected_fields(fields_parser.parse_args()['fields'], cases.fields)
+        counts = cases.day(level, day, requested)
+        if counts is None:
+            api.abort(404, 'No data for {}'.format(day))
+        return counts
+
+
+@api.route('/snapshots/<string:level>')
+@api.doc(params={'level': 'bundesland or landkreis'})
+class Snapshots(Resource):
+    @api.expect(range_parser)
+    @conditional('cases')
+    def get(self, level):
+        """
+        Accumulated deaths and infected (or the fields asked for) of every marker on every day of a range, the
+        export of many map days at once
+        """
+        check_level(level)
+        args = range_parser.parse_args()
+        cases = data_store.get('cases')
+        return cases.days_between(level, selected_fields(args['fields'], cases.fields), args['start'], args['end'])
+
+
+@api.route('/timeline/<string:level>/<string:name>')
+@api.doc(params={'level': 'bundesland or landkreis', 'name': 'Name of the Bundesland or Landkreis'})
+class Timeline(Resource):
+    @api.expect(range_parser)
+    @conditional('cases')
+    def get(self, level, name):
+        """
+        Deaths and infected per day of one Bundesland or Landkreis, accumulated and new on the day (new_deaths,
+        new_infected)
+        """
+        check_level(level)
+        args = range_parser.parse_args()
+        cases = data_store.get('cases')
+        timeline = cases.timeline(level, name, selected_fields(args['fields'], cases.fields), args['start'],
+                                  args['end'])
+        if timeline is None:
+            api.abort(404, 'Unknown {} {}'.format(level, name))
+        return timeline
+
+
+@api.route('/measures')
+class MeasureList(Resource):
+    @api.expect(measures_parser)
+    @conditional('measures')
+    def get(self):
+        """
+        The measures taken, optionally only the ones of a Bundesland, for some target groups or in force in a range
+        of days
+        """
+        args = measures_parser.parse_args()
+        measures = data_store.get('measures')
+        return measures.select(args['location'], args['zielgruppe'], args['start'], args['end'],
+                               selected_fields(args['fields'], measures.fields))
+
+
+@api.route('/measures/zielgruppen')
+class Zielgruppen(Resource):
+    @conditional('measures')
+    def get(self):
+        """
+        All target groups of the measures
+        """
+        return data_store.get('measures').zielgruppen.tolist()
+
+
 if __name__ == "__main__":
     app.run(debug=True)
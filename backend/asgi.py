@@ -0,0 +1,118 @@
+'''
+Asynchronous serving mode of the API for an ASGI server, e.g. from the backend directory:
+
+    WEB_CONCURRENCY=2 uvicorn asgi:app
+
+uvicorn starts WEB_CONCURRENCY workers, and the pools of every worker are sized for that many workers sharing the
+machine, see POOL_PROCESSES.
+
+The event loop of a worker only answers revalidations of unchanged data (304 Not Modified) itself, without touching
+the data. The small data endpoints run the Flask app of api.py in a few threads, so a reload of the data or a slow
+query does not stall the loop. The exports of many days, see OFFLOADED, are CPU-bound and run the Flask app in a
+bounded pool of processes instead, so they do not hold up the cheap requests. Exports beyond the pool and its queue
+are answered with 503 Service Unavailable.
+'''
+import asyncio
+import concurrent.futures
+import os
+
+from werkzeug.datastructures import Headers
+from werkzeug.http import parse_etags
+from werkzeug.test import EnvironBuilder
+from werkzeug.wrappers import Response
+
+from api import app as flask_app, etag_entries, matching_etag, response_etag
+from store import DataUnavailable
+
+# Paths of the CPU-bound endpoints.
+OFFLOADED = ('/snapshots/',)
+# uvicorn reads the number of workers from WEB_CONCURRENCY too.
+WORKERS = int(os.environ.get('WEB_CONCURRENCY', 1))
+# Export processes of a worker, the workers share the CPUs between them.
+POOL_PROCESSES = int(os.environ.get('API_POOL_PROCESSES', max(1, (os.cpu_count() or 1) // WORKERS)))
+# Threads of a worker for the other requests.
+THREADS = int(os.environ.get('API_THREADS', 4))
+# Exports waiting for a pool process, more are refused.
+POOL_QUEUE = int(os.environ.get('API_POOL_QUEUE', 4 * POOL_PROCESSES))
+
+
+def run_flask(method, path, query_string, headers, body):
+    '''
+    The status, headers and body of the response of the Flask app to a request.
+    '''
+    environ = EnvironBuilder(method=method, path=path, query_string=query_string, headers=headers,
+                             data=body).get_environ()
+    response = Response.from_app(flask_app, environ, buffered=True)
+    return response.status_code, list(response.headers.items()), response.get_data()
+
+
+class AsyncApi:
+    '''
+    The ASGI application, one per worker process. The pools are started and shut down with the worker (lifespan).
+    '''
+
+    def __init__(self, processes=POOL_PROCESSES, queue=POOL_QUEUE, threads=THREADS):
+        self.processes = processes
+        self.queue = queue
+        self.threads = threads
+        self._pool = None
+        self._slots = None
+        self._threads = None
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self._lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await send_response(send, *await self._respond(scope, receive))
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                self._pool = concurrent.futures.ProcessPoolExecutor(self.processes)
+                self._slots = asyncio.Semaphore(self.processes + self.queue)
+                self._threads = concurrent.futures.ThreadPoolExecutor(self.threads, thread_name_prefix='api')
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self._pool.shutdown(cancel_futures=True)
+                self._threads.shutdown(cancel_futures=True)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def _respond(self, scope, receive):
+        body = b''
+        while True:
+            message = await receive()
+            body += message.get('body', b'')
+            if not message.get('more_body'):
+                break
+        method, path = scope['method'], scope['path']
+        query_string = scope['query_string'].decode('latin-1')
+        headers = Headers([(name.decode('latin-1'), value.decode('latin-1')) for name, value in scope['headers']])
+
+        entries = etag_entries(path) if method in ('GET', 'HEAD') and 'If-None-Match' in headers else None
+        if entries is not None:
+            try:
+                tag = matching_etag(parse_etags(headers['If-None-Match']), response_etag(path, query_string, entries))
+            except DataUnavailable:
+                # The Flask app answers with the error.
+                tag = None
+            if tag is not None:
+                return 304, [('ETag', '"{}"'.format(tag))], b''
+        request = (method, path, query_string, list(headers.items()), body)
+        loop = asyncio.get_running_loop()
+        if not path.startswith(OFFLOADED):
+            return await loop.run_in_executor(self._threads, run_flask, *request)
+        if self._slots.locked():
+            return 503, [('Retry-After', '1'), ('Content-Type', 'text/plain')], b'Too many exports at once'
+        async with self._slots:
+            return await loop.run_in_executor(self._pool, run_flask, *request)
+
+
+async def send_response(send, status, headers, body):
+    await send({'type': 'http.response.start', 'status': status,
+                'headers': [(name.lower().encode('latin-1'), value.encode('latin-1')) for name, value in headers]})
+    await send({'type': 'http.response.body', 'body': body})
+
+
+app = AsyncApi()
@@ -0,0 +1,126 @@
+"""
+Requests per second of the API under a mix of cheap timeline, measures and map requests and slow exports of many
+days, served in the sync mode by gunicorn with the given number of workers and in the async mode (asgi.py) by one
+uvicorn worker with a pool of that many processes. Client processes send requests back to back for the given time
+and revalidate responses they got before with their ETag; the per-worker rate is the total divided by the workers.
+Needs gunicorn and uvicorn. Run from the backend directory:
+
+    python benchmarks/load_test.py [workers] [clients] [seconds] [sync|asgi ...]
+"""
+import multiprocessing
+import os
+import random
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+
+import numpy as np
+
+sys.path.insert(0, '.')
+from store import data_store  # noqa: E402
+
+PORT = 5052
+KINDS = ['timeline', 'measures', 'map day', 'export']
+
+
+def request_mix(seed):
+    '''
+    Endless random requests, as (kind, path) pairs.
+    '''
+    rng = random.Random(seed)
+    cases = data_store.get('cases')
+    measures = data_store.get('measures')
+    while True:
+        level = rng.choice(['bundesland', 'landkreis'])
+        start, end = sorted(rng.sample(cases.days, 2))
+        kind = rng.choice(KINDS)
+        if kind == 'timeline':
+            name = rng.choice(cases.markers[level]['name'])
+            query = rng.choice([{}, {'from': start, 'to': end}, {'fields': 'infected,new_infected', 'from': start}])
+            path = f'/timeline/{level}/{urllib.parse.quote(name)}'
+        elif kind == 'measures':
+            query = [('location', rng.choice(measures.locations))]
+            query += [('zielgruppe', group) for group in rng.sample(list(measures.zielgruppen), rng.randint(0, 3))]
+            path = '/measures'
+        elif kind == 'map day':
+            query = rng.choice([{}, {'fields': 'new_infected'}])
+            path = f'/map/{level}/{rng.choice(cases.days)}'
+        else:
+            # Many different ranges, so exports are revalidated less often than the other requests.
+            query = rng.choice([{'from': start, 'to': end}, {'fields': ','.join(cases.fields), 'from': start}])
+            path = '/snapshots/landkreis'
+        yield kind, path + ('?' + urllib.parse.urlencode(query) if query else '')
+
+
+def client(seed, seconds):
+    timings = []
+    etags = {}
+    deadline = time.perf_counter() + seconds
+    for kind, path in request_mix(seed):
+        start = time.perf_counter()
+        if start > deadline:
+            return timings
+        headers = {'Accept-Encoding': 'br, gzip'}
+        if path in etags:
+            headers['If-None-Match'] = etags[path]
+        try:
+            with urllib.request.urlopen(urllib.request.Request(f'http://127.0.0.1:{PORT}{path}', headers=headers)) \
+                    as response:
+                response.read()
+                status = response.status
+                etags[path] = response.headers['ETag']
+        except urllib.error.HTTPError as error:
+            status = error.code
+        timings.append((kind, status, time.perf_counter() - start))
+
+
+def wait_for(url, timeout=60):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            with urllib.request.urlopen(url) as response:
+                return response.read()
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.05)
+
+
+def load_test(mode, n_workers, n_clients, seconds):
+    if mode == 'sync':
+        command = ['gunicorn', f'--workers={n_workers}', f'--bind=127.0.0.1:{PORT}', 'api:app']
+    else:
+        command = ['uvicorn', f'--port={PORT}', '--log-level=warning', 'asgi:app']
+    process = subprocess.Popen([sys.executable, '-m', *command],
+                               env=dict(os.environ, WEB_CONCURRENCY='1', API_POOL_PROCESSES=str(n_workers)),
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(f'http://127.0.0.1:{PORT}/ping')
+        # Spread over the workers by the kernel, enough that each worker loaded the data.
+        client(-1, 2)
+        with multiprocessing.Pool(n_clients) as pool:
+            results = pool.starmap(client, [(seed, seconds) for seed in range(n_clients)])
+    finally:
+        process.terminate()
+        process.wait()
+
+    timings = [timing for result in results for timing in result]
+    print(f'{mode}, {n_workers} workers, {n_clients} clients: {len(timings) / seconds:.0f} requests/s, '
+          f'{len(timings) / seconds / n_workers:.0f} per worker')
+    print(f"  {'kind':<10}{'requests':>10}{'304':>7}{'errors':>8}{'p50 [ms]':>10}{'p95 [ms]':>10}")
+    for kind in KINDS:
+        statuses = np.array([status for timed_kind, status, _ in timings if timed_kind == kind])
+        latencies = np.array([latency for timed_kind, _, latency in timings if timed_kind == kind]) * 1000
+        print(f'  {kind:<10}{len(latencies):>10}{np.sum(statuses == 304):>7}'
+              f'{np.sum((statuses != 200) & (statuses != 304)):>8}{np.percentile(latencies, 50):>10.2f}'
+              f'{np.percentile(latencies, 95):>10.2f}')
+
+
+if __name__ == '__main__':
+    workers = int(sys.argv[1]) if len(sys.argv) > 1 else 2
+    clients = int(sys.argv[2]) if len(sys.argv) > 2 else 4 * workers
+    for mode in sys.argv[4:] or ['sync', 'asgi']:
+        load_test(mode, workers, clients, float(sys.argv[3]) if len(sys.argv) > 3 else 10)
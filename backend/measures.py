@@ -0,0 +1,105 @@
+'''
+The catalogue of measures of data-actions, the ones the frontend shows on its timeline: the policy measures and the
+regular winter holidays.
+'''
+import os
+
+import numpy as np
+import pandas as pd
+
+from aggregates import REPO_DIR
+
+ACTIONS_PATH = os.path.join(REPO_DIR, 'data-actions', 'policymeasures - measures_taken.csv')
+EVENTS_PATH = os.path.join(REPO_DIR, 'data-actions', 'Winterferien2019-20.csv')
+ZG_WINTER_HOLIDAYS = 'Winterferien (regulär)'
+LOCATIONS = {'Baden-Würtemberg': 'Baden-Württemberg', 'Mecklenburg Vorpommern': 'Mecklenburg-Vorpommern',
+             'NRW': 'Nordrhein-Westfalen'}
+
+# Names of the fields of a measure and the columns they are read from.
+COLUMNS = {
+    'location': 'location',
+    'geographic_level': 'geographic_level',
+    'action': 'action',
+    'start': 'startdate_action',
+    'end': 'enddate_action',
+    'announced': 'timestamp',
+    'details': 'details_action',
+    'zielgruppen': 'Zielgruppe',
+    'source': 'source',
+}
+
+
+def read_measures(actions_path=ACTIONS_PATH, events_path=EVENTS_PATH):
+    '''
+    The actions and events, cleaned like the frontend does: known misspellings of the Bundesländer and whitespace
+    around them corrected, measures without an end last until the last end of any action and rows without dates,
+    location or action dropped.
+    '''
+    df_actions = pd.read_csv(actions_path)
+    df_events = pd.read_csv(events_path)
+    df_events['Zielgruppe'] = ZG_WINTER_HOLIDAYS
+    df_events['action'] = 'Winterferien'
+    df_events['details_action'] = 'Die regulären Winterferien des Bundeslandes.'
+
+    for df in [df_actions, df_events]:
+        for column in ['startdate_action', 'enddate_action']:
+            df[column] = pd.to_datetime(df[column], errors='coerce')
+    df_actions['enddate_action'] = df_actions['enddate_action'].fillna(df_actions['enddate_action'].max())
+    df = pd.concat([df_actions, df_events], ignore_index=True)
+    df['location'] = df['location'].str.strip().replace(LOCATIONS)
+    df = df.dropna(subset=['startdate_action', 'enddate_action', 'location', 'action'], how='any')
+    return df.reset_index(drop=True)
+
+
+class Measures:
+    '''
+    The measures as JSON records with an index of their location, target groups and dates, so a selection is a few
+    comparisons of arrays instead of a scan of the records.
+    '''
+
+    fields = list(COLUMNS)
+
+    def __init__(self, df):
+        records = df[list(COLUMNS.values())].rename(columns={column: field for field, column in COLUMNS.items()})
+        for field in ['start', 'end']:
+            records[field] = records[field].dt.strftime('%Y-%m-%d')
+        # An entry lists several target groups separated by commas.
+        records['zielgruppen'] = [[group.strip() for group in groups.split(',') if group.strip()]
+                                  if isinstance(groups, str) else [] for groups in records['zielgruppen']]
+        records = records.astype(object).where(records.notna(), None)
+        self.records = records.to_dict('records')
+
+        self.location_codes, self.locations = pd.factorize(records['location'], sort=True)
+        groups = records['zielgruppen'].explode().dropna()
+        group_codes, self.zielgruppen = pd.factorize(groups, sort=True)
+        # Of shape (measures, target groups).
+        self.membership = np.zeros((len(records), len(self.zielgruppen)), dtype=bool)
+        self.membership[groups.index.to_numpy(), group_codes] = True
+        # YYYY-MM-DD strings compare like the dates.
+        self.start = records['start'].to_numpy(dtype=str)
+        self.end = records['end'].to_numpy(dtype=str)
+
+    @classmethod
+    def load(cls, actions_path=ACTIONS_PATH, events_path=EVENTS_PATH):
+        return cls(read_measures(actions_path, events_path))
+
+    def select(self, location=None, zielgruppen=None, start=None, end=None, fields=None):
+        '''
+        The measures at location which target at least one of zielgruppen and are in force on any day from start to
+        end (YYYY-MM-DD, both included). Every condition which is not given is left out. All fields unless fields
+        are given.
+        '''
+        rows = np.ones(len(self.records), dtype=bool)
+        if location is not None:
+            rows &= self.location_codes == self.locations.get_indexer([location])[0]
+        if zielgruppen:
+            columns = self.zielgruppen.get_indexer(zielgruppen)
+            rows &= self.membership[:, columns[columns >= 0]].any(axis=1)
+        if start is not None:
+            rows &= self.end >= start
+        if end is not None:
+            rows &= self.start <= end
+        records = [self.records[row] for row in np.flatnonzero(rows)]
+        if fields:
+            records = [{field: record[field] for field in fields} for record in records]
+        return records
@@ -0,0 +1,68 @@
+'''
+The data the API serves, kept in memory and indexed once per worker process instead of being read per request.
+'''
+import itertools
+import threading
+
+from aggregates import COUNTY_DAY_INDEX_PATH, STATE_MARKERS_PATH, Cases, file_signature
+from measures import ACTIONS_PATH, EVENTS_PATH, Measures
+
+
+class DataUnavailable(Exception):
+    '''
+    A file an entry is read from does not exist, e.g. the aggregates before frontend/etl.py has run.
+    '''
+
+    def __init__(self, path):
+        super().__init__('{} is missing'.format(path))
+        self.path = path
+
+
+def signature(paths):
+    try:
+        return tuple(file_signature(path) for path in paths)
+    except FileNotFoundError as error:
+        raise DataUnavailable(error.filename) from error
+
+
+class DataStore:
+    '''
+    An entry is loaded on first access and reloaded only when one of the files it was read from has changed on disk,
+    like the data store of the frontend. The returned objects are shared between all requests.
+    '''
+
+    def __init__(self):
+        self._loaders = {}
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def register(self, name, loader, paths):
+        self._loaders[name] = (loader, tuple(paths))
+
+    def get(self, name):
+        loader, paths = self._loaders[name]
+        current = signature(paths)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] != current:
+                try:
+                    entry = (current, loader())
+                except FileNotFoundError as error:
+                    raise DataUnavailable(error.filename) from error
+                self._entries[name] = entry
+        return entry[1]
+
+    def version(self, names=None):
+        '''
+        Identifies the current state of the source files of the entries names (of all entries by default), e.g. for
+        the ETags of the responses built from them. Raises DataUnavailable if one of the files is missing.
+        '''
+        names = self._loaders if names is None else names
+        paths = sorted(set(itertools.chain.from_iterable(self._loaders[name][1] for name in names)))
+        return '-'.join('{}.{}'.format(*mtime_size) for mtime_size in signature(paths))
+
+
+data_store = DataStore()
+# etl.py writes the index after the arrays.
+data_store.register('cases', Cases.load, [COUNTY_DAY_INDEX_PATH, STATE_MARKERS_PATH])
+data_store.register('measures', Measures.load, [ACTIONS_PATH, EVENTS_PATH])
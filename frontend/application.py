@@ -1,6 +1,10 @@
 # -*- coding: utf-8 -*-
+import base64
 import itertools
 import json
+import os
+import threading
+from collections import OrderedDict
 from datetime import datetime
 from textwrap import dedent
 
@@ -8,12 +12,16 @@ import dash
 import dash_core_components as dcc
 import dash_daq as daq
 import dash_html_components as html
+import flask
 import numpy as np
+import orjson
 import pandas as pd
-import plotly.express as px
-import plotly.graph_objects as go
 from dash.dependencies import Input
 from dash.dependencies import Output
+from dash.dependencies import State
+from flask_compress import Compress
+
+from etl import COUNTY_DAY_INDEX_PATH, CountyDayArrays
 
 help_text = """
 # Willkommen bei Causality vc. Corona.
@@ -41,10 +49,14 @@ Das Projekt soll auch nach dem Ende des Hackathons weiterentwickelt werden. Zurz
 """
 
 external_stylesheets = ['assets/external_stylesheet.css']
-app = dash.Dash(__name__, external_stylesheets=external_stylesheets)
-app.scripts.config.serve_locally = True
 # Needed for gunicorn
-server = app.server
+server = flask.Flask(__name__)
+# Brotli where the browser accepts it, small responses are not worth compressing. Set up here and not with the
+# compress option of Dash, which only allows gzip.
+server.config.update(COMPRESS_ALGORITHM=['br', 'gzip'], COMPRESS_MIN_SIZE=1024)
+Compress(server)
+app = dash.Dash(__name__, server=server, external_stylesheets=external_stylesheets)
+app.scripts.config.serve_locally = True
 
 def build_modal_info_overlay(id, side, content):
     """
@@ -91,21 +103,14 @@ def normalize_data(values,inhabitants):
     return values
 
 
-def read_cases_data(acc_new):
-    if acc_new == False:
-        df_cases = pd.read_csv(r'../data-cases/data_set.csv')
-        df_cases["timestamp"] = pd.to_datetime(df_cases["timestamp"])
-    elif acc_new == True:
-        df_cases = pd.read_csv(r'../data-cases/data_set_accumulated.csv')
-        df_cases["timestamp"] = pd.to_datetime(df_cases["timestamp"])
-    else:
-        df_cases = pd.read_csv(r'../data-cases/data_set.csv')
-        df_cases["timestamp"] = pd.to_datetime(df_cases["timestamp"])
-    return df_cases
+STATE_MARKERS_PATH = r'./county_centers/bundeslaender_marker.json'
+ACTIONS_PATH = r'../data-actions/policymeasures - measures_taken.csv'
+EVENTS_PATH = r'../data-actions/Winterferien2019-20.csv'
+INHABITANTS_PATH = r'../data-cases/inhabitants_per_state.xlsx'
 
 
 def read_event_data():
-    df = pd.read_csv(r'../data-actions/Winterferien2019-20.csv')
+    df = pd.read_csv(EVENTS_PATH)
     df["startdate_action"] = pd.to_datetime(df["startdate_action"], errors="coerce")
     df["enddate_action"] = pd.to_datetime(df["enddate_action"], errors="coerce")
 
@@ -114,11 +119,16 @@ def read_event_data():
     df = df.replace("NRW", "Nordrhein-Westfalen")
 
     df = df.dropna(subset=["startdate_action", "enddate_action", "location"], how="any")
+
+    # Events are shown like actions on the timeline.
+    df["Zielgruppe"] = ZG_WINTER_HOLYDAYS
+    df["action"] = "Winterferien"
+    df["details_action"] = "Die regulären Winterferien des Bundeslandes."
     return df
 
 
 def read_action_data():
-    df = pd.read_csv(r'../data-actions/policymeasures - measures_taken.csv')
+    df = pd.read_csv(ACTIONS_PATH)
 
     # convert columns to datetime which contain datetime.
     df["startdate_action"] = pd.to_datetime(df["startdate_action"], errors="coerce")
@@ -133,10 +143,233 @@ def read_action_data():
     df = df.dropna(subset=["startdate_action", "enddate_action", "geographic_level", "location", "action"], how="any")
     return df
 
+def read_zielgruppen(df_actions):
+    '''
+    All target groups of the actions (and events), an entry may list several of them.
+    '''
+    zielgruppen = df_actions["Zielgruppe"].dropna().unique()
+    # separete several zielgruppen in the same entry (comma-separated)
+    zielgruppen = itertools.chain.from_iterable([zg.split(",") for zg in zielgruppen])
+    zielgruppen = [zg.strip() for zg in zielgruppen]  # remove any whitespaces left.
+    return sorted(set(zielgruppen))  # Remove any doubles.
+
+
 def read_inhabitants_per_state_data():
-    df = pd.read_excel(r'../data-cases/inhabitants_per_state.xlsx')
+    df = pd.read_excel(INHABITANTS_PATH)
     return df
 
+
+def read_state_markers():
+    with open(STATE_MARKERS_PATH) as json_file:
+        return json.load(json_file)
+
+
+def file_signature(path):
+    '''
+    Cheap fingerprint of a file on disk, changes whenever the file is rewritten.
+    '''
+    stat = os.stat(path)
+    return stat.st_mtime_ns, stat.st_size
+
+
+class DataStore:
+    '''
+    Keeps every data source in memory once per worker process.
+
+    An entry is loaded on first access and reloaded only when one of the files it was read from has changed on
+    disk, so callbacks only pay for filtering. The returned frames are shared between all callbacks and must not
+    be modified in place.
+    '''
+
+    def __init__(self):
+        self._loaders = {}
+        self._entries = {}
+        # Reentrant, as loaders of derived entries fetch other entries from the store.
+        self._lock = threading.RLock()
+
+    def register(self, name, loader, paths):
+        self._loaders[name] = (loader, tuple(paths))
+
+    def get(self, name):
+        loader, paths = self._loaders[name]
+        signature = tuple(file_signature(path) for path in paths)
+        with self._lock:
+            entry = self._entries.get(name)
+            if entry is None or entry[0] != signature:
+                entry = (signature, loader())
+                self._entries[name] = entry
+        return entry[1]
+
+    def version(self):
+        '''
+        Identifies the current state of all source files, e.g. to key caches of results derived from them.
+        '''
+        paths = sorted(set(itertools.chain.from_iterable(paths for _, paths in self._loaders.values())))
+        return hash(tuple(file_signature(path) for path in paths))
+
+
+class FigureCache:
+    '''
+    Least recently used figures, kept serialized to JSON bytes with numeric arrays as typed arrays, see
+    typed_arrays, and bounded by the total size of those bytes.
+
+    Counts hits, misses and evictions, see stats. Like the data store, there is one cache per worker process.
+    '''
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._figures = OrderedDict()
+        self._bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._lock = threading.Lock()
+
+    def get(self, key, build):
+        '''
+        The figure stored for key, or the one build() returns, which is stored if it fits into the budget.
+        '''
+        with self._lock:
+            serialized = self._figures.get(key)
+            if serialized is not None:
+                self._figures.move_to_end(key)
+                self.hits += 1
+            else:
+                self.misses += 1
+        if serialized is None:
+            from plotly.io.json import to_json_plotly  # Deferred, importing plotly is slow.
+
+            # Built outside the lock, concurrent misses of the same key only build it twice.
+            serialized = to_json_plotly(typed_arrays(build())).encode()
+            self._put(key, serialized)
+        return orjson.loads(serialized)
+
+    def peek(self, key):
+        '''
+        The figure stored for key or None, without counting it as a hit or miss.
+        '''
+        with self._lock:
+            serialized = self._figures.get(key)
+        return None if serialized is None else orjson.loads(serialized)
+
+    def _put(self, key, serialized):
+        if len(serialized) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._figures:
+                return
+            self._figures[key] = serialized
+            self._bytes += len(serialized)
+            while self._bytes > self.max_bytes:
+                _, evicted = self._figures.popitem(last=False)
+                self._bytes -= len(evicted)
+                self.evictions += 1
+
+    def stats(self):
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'entries': len(self._figures), 'bytes': self._bytes, 'max_bytes': self.max_bytes}
+
+
+class StateCube:
+    '''
+    Case counts per Bundesland and day as a dense array of shape (states, days, metrics).
+
+    Built once per data version, so a timeline is an array slice instead of a groupby over all county rows.
+    '''
+    metrics = CountyDayArrays.metrics
+
+    def __init__(self, states, days, values):
+        self.states = states
+        self.days = days
+        self.values = values
+        self.cumulative = np.cumsum(self.values, axis=1)
+        # The cube is shared by all callbacks, timelines and frames are views into it.
+        self.values.flags.writeable = False
+        self.cumulative.flags.writeable = False
+        self._state_to_index = {state: index for index, state in enumerate(self.states)}
+
+    @classmethod
+    def from_county_arrays(cls, arrays):
+        states = sorted(set(arrays.countries))
+        state_index = pd.Categorical(arrays.countries, categories=states).codes
+        values = np.zeros((len(states), len(arrays.days), len(cls.metrics)), dtype=np.int64)
+        # Adds the (days, metrics) slice of every county to the one of its Bundesland.
+        np.add.at(values, state_index, np.moveaxis(arrays.daily, 1, 0))
+        return cls(states, arrays.days, values)
+
+    def timeline(self, state, accumulated=False):
+        '''
+        Daily or accumulated values of one Bundesland, indexed by day.
+        '''
+        if state not in self._state_to_index:
+            return pd.DataFrame(columns=self.metrics, index=self.days[:0], dtype=np.int64)
+        values = self.cumulative if accumulated else self.values
+        return pd.DataFrame(values[self._state_to_index[state]], index=self.days, columns=self.metrics)
+
+    def to_frame(self, accumulated=False):
+        '''
+        Long format with one row per Bundesland and day, ordered by day.
+        '''
+        values = self.cumulative if accumulated else self.values
+        df = pd.DataFrame({
+            'country': np.tile(self.states, len(self.days)),
+            'timestamp': np.repeat(self.days, len(self.states)),
+        })
+        for metric_index, metric in enumerate(self.metrics):
+            df[metric] = values[:, :, metric_index].T.ravel()
+        return df
+
+
+class ActionIndex:
+    '''
+    The actions and events of the timeline with a boolean membership matrix of shape (actions, target groups).
+
+    Built once per data version, so filtering on any combination of target groups is an ANY over matrix columns
+    instead of splitting the comma-separated Zielgruppe strings on every callback.
+    '''
+
+    def __init__(self, df_actions):
+        self.actions = df_actions.reset_index(drop=True)
+        # One row per (action, target group), with the whitespace around the comma-separated entries removed.
+        groups = self.actions['Zielgruppe'].str.split(',').explode().str.strip()
+        groups = groups[groups.notna() & (groups != '')]
+        group_codes, self.zielgruppen = pd.factorize(groups, sort=True)
+        self.membership = np.zeros((len(self.actions), len(self.zielgruppen)), dtype=bool)
+        self.membership[groups.index.to_numpy(), group_codes] = True
+        self.location_codes, self.locations = pd.factorize(self.actions['location'])
+        # The index is shared by all callbacks.
+        self.membership.flags.writeable = False
+        self.location_codes.flags.writeable = False
+
+    def select(self, location, zielgruppen):
+        '''
+        Actions at location that target at least one of zielgruppen (OR, according to issue #14).
+        '''
+        columns = self.zielgruppen.get_indexer(zielgruppen)
+        rows = self.membership[:, columns[columns >= 0]].any(axis=1)
+        rows &= self.location_codes == self.locations.get_indexer([location])[0]
+        return self.actions[rows]
+
+
+data_store = DataStore()
+data_store.register('county_arrays', CountyDayArrays.load, [COUNTY_DAY_INDEX_PATH])
+data_store.register('actions', read_action_data, [ACTIONS_PATH])
+data_store.register('events', read_event_data, [EVENTS_PATH])
+# The winter holidays are a target group of their own, so they can be selected like the actions.
+data_store.register('zielgruppen',
+                    lambda: read_zielgruppen(pd.concat([data_store.get('actions'), data_store.get('events')])),
+                    [ACTIONS_PATH, EVENTS_PATH])
+data_store.register('inhabitants', read_inhabitants_per_state_data, [INHABITANTS_PATH])
+data_store.register('state_markers', read_state_markers, [STATE_MARKERS_PATH])
+data_store.register('state_cube', lambda: StateCube.from_county_arrays(data_store.get('county_arrays')),
+                    [COUNTY_DAY_INDEX_PATH])
+data_store.register('action_index',
+                    lambda: ActionIndex(pd.concat([data_store.get('actions'), data_store.get('events')],
+                                                  ignore_index=True)),
+                    [ACTIONS_PATH, EVENTS_PATH])
+
+
 def create_timeline(df_cases, df_actions):
     # df_cases.index = df_cases['timestamp']
     df_cases.index = df_cases.index.tz_localize(None)
@@ -161,39 +394,24 @@ def create_timeline(df_cases, df_actions):
     return date_list
 
 
-df_cases = read_cases_data(acc_new=False)
-df_actions = read_action_data()
-relevant_countries = df_cases["country"].unique().tolist()
-
-df_zielgruppe =  df_actions["Zielgruppe"].dropna().unique()
-# separete several zielgruppen in the same entry (comma-separated)
-df_zielgruppe = itertools.chain.from_iterable([zg.split(",") for zg in df_zielgruppe])
-df_zielgruppe = [zg.strip() for zg in df_zielgruppe] # remove any whitespaces left.
-df_zielgruppe = list(set(df_zielgruppe)) # Remove any doubles.
-
-
-def filter_data_set(df_cases=df_cases, df_actions=df_actions, country='Bayern', zielgruppe_filter='Versammlungen',
-                    acc_new=False, norm=False):
-    df_cases = read_cases_data(acc_new=acc_new)
-    df_actions = read_action_data()
-    df_inhabitants_per_state = read_inhabitants_per_state_data()
+def filter_data_set(df_actions=None, country='Bayern', zielgruppe_filter='Versammlungen', acc_new=False, norm=False):
+    '''
+    Cases of country and its actions for any of the target groups in zielgruppe_filter. Without df_actions, the
+    actions and events of the data store are used.
+    '''
+    if df_actions is None:
+        action_index = data_store.get('action_index')
+    else:
+        action_index = ActionIndex(df_actions)
+    df_inhabitants_per_state = data_store.get('inhabitants')
     inhabitants = df_inhabitants_per_state[df_inhabitants_per_state['state'] == country]['inhabitants']
-    df_cases=df_cases[df_cases['country']==country]
-    df_cases = df_cases.groupby(['timestamp']).sum().tz_localize(None)
+    df_cases = data_store.get('state_cube').timeline(country, accumulated=acc_new)
     if norm == True:
         df_cases = normalize_data(df_cases,inhabitants)
 
-    df_actions = df_actions[df_actions['location'] == country]
     if type(zielgruppe_filter) != list:
         zielgruppe_filter = [zielgruppe_filter]
-
-    # Ok, this is a little involved: We need to know whether any of the zielgruppen for a given entry (encoded in
-    # a single, comma-separated string) are in the zielgruppe_filter. Therefore, we split the entry_zielgruppen and
-    # test them separatly. We ad one True value to the list comprehension if the currenty zg_entry is in the
-    # zielgruppe_filter. If none are in the filter, the list comprehension returns an empty list. If at least one
-    # of the zielgruppen of the entry is in the filter, the list is not empty and we use that entry (OR, according to
-    # issue #14).
-    df_actions = df_actions[df_actions["Zielgruppe"].str.split(',', expand=True).isin(zielgruppe_filter).any(axis=1)]
+    df_actions = action_index.select(country, zielgruppe_filter)
     return df_cases,df_actions
 
 
@@ -206,11 +424,15 @@ def build_merged_dataset(df_cases, timeline):
 
 
 am_hover_template = """
-<b>%{{text}}</b><br>
-{details_action} <br><br>
-<i>Vom {start_date} bis vorauss. {end_date}</i>
+<b>%{hovertext}</b><br>
+%{customdata[0]} <br><br>
+<i>Vom %{customdata[1]} bis vorauss. %{customdata[2]}</i>
 <extra></extra>
 """
+# The markers at the point of effect and at the end only name the action, its details are shown at its start.
+am_label_template = "<b>%{hovertext}</b><extra></extra>"
+
+am_effect_delay = np.timedelta64(15, 'D')
 
 
 def wrap_hover_text(text):
@@ -227,7 +449,33 @@ def wrap_hover_text(text):
     return "<br>".join(fracs)
 
 
-def build_am_data(df_cases, action_data):
+def segments(*columns):
+    '''
+    Interleaves the point columns of the segments, each followed by a gap to break the line between segments.
+    All columns must have the same length, one entry per segment.
+
+    Numbers stay a float array with NaN gaps, which plotly serializes as null without visiting every element.
+    '''
+    n_points = len(columns) + 1
+    if all(np.asarray(column).dtype.kind in 'iuf' for column in columns):
+        points = np.full(len(columns[0]) * n_points, np.nan)
+    else:
+        points = np.full(len(columns[0]) * n_points, None, dtype=object)
+    for i, column in enumerate(columns):
+        points[i::n_points] = column
+    return points
+
+
+def build_am_traces(df_cases, action_data):
+    '''
+    Action markers as a fixed handful of plain trace dicts, one per segment type and color. The segments of all
+    actions are joined into the same trace and separated by None.
+
+    The details of an action are sent once, as customdata of its start marker. The markers at its point of effect
+    and its end only name it, the lines are skipped on hover.
+
+    The dicts hold exactly what the go.Scatter of build_am_data serialize to, keys in the same order.
+    '''
     # action_data = action_data.reindex(list(range(1,len(action_data)+1)))
     action_data.index = list(range(1, len(action_data) + 1))
     if not df_cases['infected'].empty:
@@ -237,79 +485,92 @@ def build_am_data(df_cases, action_data):
 
     action_data = action_data.sort_values("startdate_action")
 
-    # grey lines at start of the action.
-    data = [go.Scatter(
-        x=[action["startdate_action"], action["startdate_action"]],
-        y=[max_cases * row_num, 0],
-        mode="lines",
-        line=dict(color="rgb(200,200,200)"),
-    )
-        for row_num, action in action_data.iterrows()
-    ]
-    # grey lines at point of effect of the action.
-    data += [go.Scatter(
-        x=[action["startdate_action"] + np.timedelta64(15, 'D'),
-           action["startdate_action"] + np.timedelta64(15, 'D')],
-        y=[max_cases * row_num, 0],
-        mode="lines",
-        line=dict(color="rgb(200,200,200)"),
-    )
-        for row_num, action in action_data.iterrows()
-    ]
-
-    # The actual action markers
-    data += [go.Scatter(
-        x=[action["startdate_action"], action["startdate_action"] + np.timedelta64(15, 'D')],
-        y=[max_cases * row_num, max_cases * row_num],
-        marker={"size": 16,
-                "symbol": "triangle-down",
-                "color": "rgb(220,220,220)"},
-        mode="lines+markers",
-        name="bla",  # action["action"],
-        hovertemplate=am_hover_template.format(details_action=wrap_hover_text(action["details_action"]),
-                                               start_date=action["startdate_action"].strftime("%d.%m.%Y"),
-                                               end_date=action["enddate_action"].strftime("%d.%m.%Y")),
-        # TODO: Evaluate what is possible with this template and what is impossible.
-        text=[action["action"] + "<br> Beginn", ""],
-        textposition="bottom center",
-    )
-        for row_num, action in action_data.iterrows()
-    ]
-
-    data += [go.Scatter(
-        x=[action["startdate_action"] + np.timedelta64(15, 'D'),
-           action["enddate_action"]],
-        y=[max_cases * row_num, max_cases * row_num],
-        marker={"size": 16,
-                "symbol": "triangle-down",
-                "color": "blue" if action["Zielgruppe"] == ZG_WINTER_HOLYDAYS else "green"},
-        mode="lines+markers",
-        text=[action["action"] + "<br>mögl. Effekt", action["action"] + "<br>vorraus. Ende"],
-        textposition="bottom center",
-        hovertemplate=am_hover_template.format(details_action=wrap_hover_text(action["details_action"]),
-                                               start_date=action["startdate_action"].strftime("%d.%m.%Y"),
-                                               end_date=action["enddate_action"].strftime("%d.%m.%Y")),
+    # ISO strings, like plotly serializes timestamps, but much cheaper to copy and encode than Timestamp objects.
+    def iso(dates):
+        return dates.dt.strftime("%Y-%m-%dT%H:%M:%S").to_numpy(dtype=object)
+
+    start = iso(action_data["startdate_action"])
+    effect = iso(action_data["startdate_action"] + am_effect_delay)
+    end = iso(action_data["enddate_action"])
+    end_effect = iso(action_data["enddate_action"] + am_effect_delay)
+    height = max_cases * action_data.index.to_numpy()
+    zero = np.zeros(len(action_data))
+    name = action_data["action"].to_numpy(dtype=object)
+
+    details = np.array([(wrap_hover_text(details_action), start_date, end_date) for details_action, start_date, end_date
+                        in zip(action_data["details_action"],
+                               action_data["startdate_action"].dt.strftime("%d.%m.%Y"),
+                               action_data["enddate_action"].dt.strftime("%d.%m.%Y"))] or np.empty((0, 3)),
+                       dtype=object)
+
+    grey = "rgb(200,200,200)"
+    # grey lines at start of the action and at its point of effect.
+    data = [{"hoverinfo": "skip", "line": {"color": grey}, "mode": "lines", "x": segments(start, start),
+             "y": segments(height, zero), "type": "scatter"},
+            {"hoverinfo": "skip", "line": {"color": grey}, "mode": "lines", "x": segments(effect, effect),
+             "y": segments(height, zero), "type": "scatter"},
+            # The span without effects yet, grey like the markers at the start of the actions.
+            {"hoverinfo": "skip", "line": {"color": "rgb(220,220,220)"}, "mode": "lines",
+             "x": segments(start, effect), "y": segments(height, height), "type": "scatter"}]
+
+    # A line can only have one color, so the expected duration of the action is split by color.
+    winter_holydays = (action_data["Zielgruppe"] == ZG_WINTER_HOLYDAYS).to_numpy()
+    for color, selected in [("green", ~winter_holydays), ("blue", winter_holydays)]:
+        if not selected.any():
+            continue
+        data.append({
+            "hovertemplate": am_label_template,
+            "hovertext": segments(name[selected] + "<br>mögl. Effekt", name[selected] + "<br>vorraus. Ende"),
+            "marker": {"color": color,
+                       "size": 16,
+                       "symbol": "triangle-down"},
+            "mode": "lines+markers",
+            "x": segments(effect[selected], end[selected]),
+            "y": segments(height[selected], height[selected]),
+            "type": "scatter",
+        })
+        data.append({
+            "hoverinfo": "skip",
+            "marker": {"color": color},
+            "mode": "lines",
+            "x": segments(effect[selected], end_effect[selected]),
+            "y": segments(height[selected], height[selected]),
+            "type": "scatter",
+        })
+
+    # The markers at the start of the actions, drawn last and so on top. Each carries the details of its action.
+    data.append({
+        "customdata": details,
+        "hovertemplate": am_hover_template,
         # TODO: Evaluate what is possible with this template and what is impossible.
-    )
-        for row_num, action in action_data.iterrows() if action["enddate_action"]
-    ]
-    data += [go.Scatter(
-        x=[action["startdate_action"] + np.timedelta64(15, 'D'),
-           action["enddate_action"] + np.timedelta64(15, 'D')],
-        y=[max_cases * row_num, max_cases * row_num],
-        marker={"color": "blue" if action["Zielgruppe"] == ZG_WINTER_HOLYDAYS else "green"},
-        mode="lines",
-    )
-        for row_num, action in action_data.iterrows() if action["enddate_action"]
-    ]
+        "hovertext": name + "<br> Beginn",
+        "marker": {"color": "rgb(220,220,220)",
+                   "size": 16,
+                   "symbol": "triangle-down"},
+        "mode": "markers",
+        "x": start,
+        "y": height,
+        "type": "scatter",
+    })
 
     return data
 
 
+def build_am_data(df_cases, action_data):
+    '''
+    The traces of build_am_traces as validated go.Scatter objects.
+    '''
+    import plotly.graph_objects as go  # Deferred, importing plotly is slow.
+
+    return [go.Scatter(trace) for trace in build_am_traces(df_cases, action_data)]
+
+
 def merge_figures(bar_figure, am_figure, log, ):
     '''
     Merge the plots with add trace
     '''
+    import plotly.graph_objects as go  # Deferred, importing plotly is slow.
+
     fig = go.Figure()
     for am in am_figure:
         fig.add_trace(am)
@@ -339,141 +600,329 @@ def merge_figures(bar_figure, am_figure, log, ):
     return fig
 
 
+# Integer types of plotly.js typed arrays, narrowest first.
+typed_array_integers = ['u1', 'i1', 'u2', 'i2', 'u4', 'i4']
+# Shorter arrays are sent as JSON numbers, the typed array header would outweigh what they save.
+TYPED_ARRAY_MIN_LENGTH = 16
+
+
+def typed_array_dtype(values):
+    '''
+    The dtype of a plotly.js typed array for values, None for values better sent as JSON numbers: the narrowest
+    integer type for integers, float32 for float32 (the map coordinates). float64 values, like the heights of the
+    action markers, are mostly shorter as text than as 8 bytes each, and so are short arrays.
+    '''
+    if values.size < TYPED_ARRAY_MIN_LENGTH:
+        return None
+    if values.dtype.kind in 'iu':
+        low, high = values.min(), values.max()
+        for dtype in typed_array_integers:
+            if np.iinfo(dtype).min <= low and high <= np.iinfo(dtype).max:
+                return dtype
+    elif values.dtype == np.float32:
+        return 'f4'
+    return None
+
+
+def typed_arrays(figure):
+    '''
+    The figure (or part of it) with the numeric numpy arrays replaced by base64 typed arrays of plotly.js (dtype,
+    bdata and shape), see typed_array_dtype. plotly.js reads typed arrays without parsing numbers.
+    '''
+    if isinstance(figure, dict):
+        # The template is the largest part of a layout and plain JSON data, see default_template.
+        return {name: value if name == 'template' else typed_arrays(value) for name, value in figure.items()}
+    if isinstance(figure, list):
+        return [typed_arrays(value) for value in figure]
+    if not isinstance(figure, np.ndarray) or figure.dtype.kind not in 'iuf':
+        return figure
+    dtype = typed_array_dtype(figure)
+    if dtype is None:
+        return figure
+    values = np.ascontiguousarray(figure, dtype='<' + dtype)
+    typed = {'dtype': dtype, 'bdata': base64.b64encode(values.tobytes()).decode('ascii')}
+    if values.ndim > 1:
+        typed['shape'] = ','.join(str(length) for length in values.shape)
+    return typed
+
+
+def default_template():
+    '''
+    The default template plotly.graph_objects adds to every figure, as plain dict. Shared by all figures built as
+    dicts, must not be modified.
+    '''
+    import plotly.io as pio
+
+    global plotly_template
+    if plotly_template is None:
+        plotly_template = pio.templates[pio.templates.default].to_plotly_json()
+    return plotly_template
+
+
+plotly_template = None
+
+
+def timeline_layout(log):
+    '''
+    The layout merge_figures ends up with.
+    '''
+    return {
+        'template': default_template(),
+        'xaxis': {'tickangle': 90, 'type': 'date'},
+        'yaxis': {'title': {'text': "Number of new cases"}, 'type': 'log' if log else 'linear'},
+        'showlegend': False,
+        'barmode': 'group',
+        'plot_bgcolor': 'white',
+    }
+
+
+def merge_figure_dicts(bar_trace, am_traces, log):
+    '''
+    Same figure as merge_figures, assembled as a plain dict from trace dicts without the validation of
+    plotly.graph_objects.
+    '''
+    return {'data': am_traces + [bar_trace], 'layout': timeline_layout(log)}
+
+
 def main_figure(country, zielgruppe, acc_new=False,log = False,norm =False):
-    df_cases = read_cases_data(acc_new=acc_new)
-    df_actions = read_action_data()
-    df_events = read_event_data()
-
-    df_events["Zielgruppe"] = ZG_WINTER_HOLYDAYS
-    df_events["action"] = "Winterferien"
-    df_events["details_action"] = "Die regulären Winterferien des Bundeslandes."
-    df_actions = pd.concat([df_actions, df_events])
-    df_cases, df_actions = filter_data_set(country=country, zielgruppe_filter=zielgruppe,
-                                           acc_new=acc_new,norm=norm)  # filter on country level
+    '''
+    The Timeline figure as a plain dict, see merge_figure_dicts. Dash serializes it like the go.Figure of
+    merge_figures.
+    '''
+    df_cases, df_actions = filter_data_set(country=country, zielgruppe_filter=zielgruppe, acc_new=acc_new,
+                                           norm=norm)  # filter on country level
     timeline = create_timeline(df_cases, df_actions)
     df_merged = build_merged_dataset(df_cases, timeline)
-    bar_charts = [go.Bar(x=df_merged['Time'], y=df_merged['infected'], name='Bayern', marker_color='#3a1261')]
+    bar_trace = {'marker': {'color': '#3a1261'}, 'name': 'Bayern', 'x': df_merged['Time'].to_numpy(dtype=object),
+                 'y': df_merged['infected'].to_numpy(), 'type': 'bar'}
     if not df_actions.empty:
-        am_charts = build_am_data(df_cases, df_actions)
+        am_traces = build_am_traces(df_cases, df_actions)
     else:
-        am_charts = []
-    figure = merge_figures(bar_charts, am_charts, log)
-    return figure
+        am_traces = []
+    return merge_figure_dicts(bar_trace, am_traces, log)
 
 
+def map_points(bubble_for_each_county, omit_zero=False):
+    '''
+    The markers of the map per Bundesland or per Landkreis: coordinates, names (text and, for counties, hovertext)
+    and their accumulated values of shape (days, points, metrics). With omit_zero, counties without any case on all
+    days are left out.
+    '''
+    if not bubble_for_each_county:
+        cube = data_store.get('state_cube')
+        country_to_middles = data_store.get('state_markers')
+        points = {
+            'days': cube.days,
+            'values': np.moveaxis(cube.cumulative, 1, 0),
+            'lat': np.array([country_to_middles[state][0] for state in cube.states]),
+            'lon': np.array([country_to_middles[state][1] for state in cube.states]),
+            'text': np.array(cube.states, dtype=object),
+            'hovertext': None,
+            'hover_names': ['country'],
+            'size_max': 40,
+        }
+    else:
+        arrays = data_store.get('county_arrays')
+        points = {
+            'days': arrays.days,
+            'values': arrays.cumulative,
+            'lat': arrays.lat,
+            'lon': arrays.lon,
+            'text': np.array(arrays.countries, dtype=object),
+            'hovertext': np.array(arrays.counties, dtype=object),
+            'hover_names': ['country', 'county'],
+            'size_max': 20,
+        }
+
+    if omit_zero:
+        reported = points['values'].any(axis=(0, 2))
+        for name in ['lat', 'lon', 'text', 'hovertext']:
+            if points[name] is not None:
+                points[name] = points[name][reported]
+        points['values'] = points['values'][:, reported]
+    return points
+
+
+def map_hovertemplate(label, hover_names):
+    names = ''.join(f'<br>{name}=%{{{attribute}}}' for name, attribute in zip(hover_names, ['text', 'hovertext']))
+    # The coordinates are float32, formatted so that they do not show its rounding.
+    return (f'timestamp={label}<br>infected=%{{marker.size}}<br>lat=%{{lat:.5f}}<br>lon=%{{lon:.5f}}{names}'
+            f'<br>deaths=%{{customdata}}<extra></extra>')
+
+
+def map_day(points, day_index):
+    '''
+    What changes on the map from day to day: the bubble sizes (infected), the deaths and the date in the hover text.
+    '''
+    values = points['values'][day_index]
+    return {'customdata': values[:, StateCube.metrics.index('deaths')],
+            'hovertemplate': map_hovertemplate(points['days'][day_index].strftime('%Y-%m-%d'), points['hover_names']),
+            'marker.size': values[:, StateCube.metrics.index('infected')]}
 
 
-def create_figure(bubble_for_each_county):
-    with open('./county_centers/bundeslaender_marker.json') as json_file:
-        country_to_middles = json.load(json_file)
+def create_figure(bubble_for_each_county, day_index=-1, omit_zero=False):
+    '''
+    The map of accumulated cases per Bundesland or per Landkreis on one day, the last one by default. Other days are
+    sent as patches of map_day when the day slider moves, so the figure does not grow with the number of days.
+    '''
+    # Determined with https://gps-coordinates.org/germany-latitude.php
+    germany_center = {'lat': 51.133481, 'lon': 10.018343}
+    zoom = 4.9
+    map_style = 'stamen-toner'
 
-    with open('./county_centers/landkreise_marker.json') as json_file:
-        county_to_middles = json.load(json_file)
+    points = map_points(bubble_for_each_county, omit_zero)
+    infected = points['values'][:, :, StateCube.metrics.index('infected')]
+    day = map_day(points, day_index)
+    # Like plotly express, bubble areas are scaled to the largest value of all days.
+    sizeref = float(infected.max()) / points['size_max'] ** 2 if infected.size else 1
+    trace = {'customdata': day['customdata'], 'hovertemplate': day['hovertemplate'], 'hovertext': points['hovertext'],
+             # float32 is precise to about a meter here.
+             'lat': points['lat'].astype(np.float32), 'lon': points['lon'].astype(np.float32),
+             'marker': {'color': '#636efa', 'size': day['marker.size'], 'sizemode': 'area', 'sizeref': sizeref},
+             'mode': 'markers', 'showlegend': False, 'subplot': 'mapbox', 'text': points['text'],
+             'type': 'scattermapbox'}
+    if points['hovertext'] is None:
+        del trace['hovertext']
+    layout = {
+        'template': default_template(),
+        'mapbox': {'domain': {'x': [0.0, 1.0], 'y': [0.0, 1.0]}, 'center': germany_center, 'zoom': zoom,
+                   'style': map_style},
+        'legend': {'tracegroupgap': 0, 'itemsizing': 'constant'},
+        'margin': {'t': 60},
+        'height': 800,
+        'clickmode': 'event+select',
+        'uirevision': 'x',
+    }
+    return {'data': [trace], 'layout': layout}
+
+
+# Both levels of the map for dozens of data versions of the shipped data. Figures of older versions are never asked
+# for again, so they are the least recently used ones and evicted first.
+MAP_CACHE_BYTES = 2 ** 20
+map_figures = FigureCache(MAP_CACHE_BYTES)
+
+
+def cached_map_figure(bubble_for_each_county):
+    '''
+    The map figure for one state of the Bundesland/Landkreis switch on the last day, built once per data version.
 
-    with open('../data-cases/RKI_COVID19.geojson') as json_file:
-        data_cases = json.load(json_file)
+    Every call returns a fresh copy, see FigureCache, which the caller may change.
+    '''
+    return map_figures.get((data_store.version(), bool(bubble_for_each_county)),
+                           lambda: create_figure(bubble_for_each_county))
 
-    elements_to_remove = []
-    case_list = []
-    for element in data_cases['features']:
-        props = element['properties']
-        county_id = props['IdLandkreis']
 
-        if county_id not in county_to_middles:
-            # print("We have no geocoords for:", county_id, "therefore throwing out")
-            elements_to_remove.append(element)
-        else:
-            case_list.append(props)
-
-    rows = []
-    county_day_map = {}
-    county_to_country_lat_lon = {}
-    for index, case in enumerate(case_list):
-        county = case['Landkreis']
-        country = case['Bundesland']
-        lat, lon = tuple(county_to_middles[case['IdLandkreis']])
-        infected = case['AnzahlFall']
-        timestamp = case['Meldedatum']
-        deaths = case['AnzahlTodesfall']
-        row = [county, country, lat, lon, timestamp, infected, deaths]
-        rows.append(row)
-        county_day_map[(county, timestamp)] = row
-        if county not in county_to_country_lat_lon:
-            county_to_country_lat_lon[county] = [country, lat, lon]
-
-    df_uncompleted = pd.DataFrame(data=rows,
-                                  columns=['county', 'country', 'lat', 'lon', 'timestamp', 'infected', 'deaths'])
-
-    unique_days = df_uncompleted['timestamp'].unique()
-    unique_days.sort()
-    filled_unique_days = pd.date_range(unique_days[0], unique_days[-1])
-    # Back to old format to not break anything
-    # Why does filled_unique_days.map(lambda x: (x.strftime('%Y-%m-%dT%H:%M:%S.%f')[:-3] + "Z")) not work?
-    filled_unique_days = filled_unique_days.map(lambda x: (x.strftime('%Y-%m-%dT%H:%M:%S.%f')))
-    filled_unique_days = filled_unique_days.map(lambda x: x[:-3] + "Z")
-    unique_counties = df_uncompleted['county'].unique()
-    unique_counties.sort()
-
-    full_matrix = []
-    for day, county in itertools.product(filled_unique_days, unique_counties):
-        if (county, day) in county_day_map:
-            full_matrix.append(county_day_map[(county, day)])
+def map_day_patch(bubble_for_each_county, day_index):
+    '''
+    A dash.Patch showing another day on the map figure of the same level.
+    '''
+    patch = dash.Patch()
+    for name, value in typed_arrays(map_day(map_points(bubble_for_each_county), day_index)).items():
+        if name == 'marker.size':
+            patch['data'][0]['marker']['size'] = value
         else:
-            full_matrix.append([county] + county_to_country_lat_lon[county] + [day] + [0, 0])
+            patch['data'][0][name] = value
+    return patch
 
-    df = pd.DataFrame(data=full_matrix,
-                      columns=['county', 'country', 'lat', 'lon', 'timestamp', 'infected', 'deaths'])
 
-    df = df.sort_values(by=['county', 'timestamp'], ascending=[True, True])
-    # df['timestamp'] = pd.to_datetime(df['timestamp'])
-    # Make it so that ('county', 'timestamp') are unique and sum up deaths and infected while doing so
-    df = df.groupby(by=['timestamp', 'county', 'lat', 'lon', 'country'])[['deaths', 'infected']].sum().reset_index(). \
-        sort_values(by=['country', 'timestamp'], ascending=[True, True])
-    df.to_csv('data_set.csv', index=False)
+# Time per day of the map animation.
+MAP_PLAY_INTERVAL_MS = 500
 
-    df[['deaths', 'infected']] = df.groupby(by=['county'])[['deaths', 'infected']].cumsum()
 
-    df.to_csv('data_set_accumulated.csv', index=False)
+def map_day_marks(days):
+    # One mark per month keeps the slider readable and its size independent of the number of days.
+    return {index: day.strftime('%d.%m.') for index, day in enumerate(days) if day.day == 1 or index == 0}
 
-    df = df.sort_values(by=['county', 'timestamp'], ascending=[True, False])
 
-    # Cut off time
-    df['timestamp'] = df['timestamp'].str.split('T').str[0]
+# Enough for a few hundred Timeline figures of the shipped data.
+TIMELINE_CACHE_BYTES = 64 * 2 ** 20
+timeline_figures = FigureCache(TIMELINE_CACHE_BYTES)
 
-    # Determined with https://gps-coordinates.org/germany-latitude.php
-    germany_center = {'lat': 51.133481, 'lon': 10.018343}
-    zoom = 4.9
-    map_style = 'stamen-toner'
 
-    if not bubble_for_each_county:
-        df = df.groupby(by=['country', 'lat', 'lon', 'timestamp'])[['infected', 'deaths']].sum().reset_index()
-        middles = df['country'].map(lambda x: country_to_middles[x])
-        new_lat_lon = pd.DataFrame()
-        new_lat_lon['lat'] = middles.map(lambda x: x[0])
-        new_lat_lon['lon'] = middles.map(lambda x: x[1])
-        df[['lat', 'lon']] = new_lat_lon
-        # Needed to have time slider values sorted
-        df = df.sort_values(by='timestamp')
-
-        fig = px.scatter_mapbox(df, lat='lat', lon='lon', size="infected", size_max=40, mapbox_style=map_style,
-                                animation_frame='timestamp', height=800, hover_data=['country', 'infected', 'deaths'],
-                                custom_data=['country'], center=germany_center, zoom=zoom)
-
-    if bubble_for_each_county:
-        # Needed to have time slider values sorted
-        df = df.sort_values(by='timestamp')
-
-        fig = px.scatter_mapbox(df, lat='lat', lon='lon', size="infected", mapbox_style=map_style,
-                                animation_frame='timestamp', height=800, hover_data=['country', 'county', 'infected',
-                                                                                     'deaths'],
-                                custom_data=['country', 'county'], center=germany_center, zoom=zoom)
-    # fig = px.scatter_geo(df, hover_name="county", size="infected", animation_frame="timestamp",
-    #                      projection="natural earth")
-
-    fig.layout['clickmode'] = 'event+select'
-    fig.layout['uirevision'] = 'x'
+def timeline_key(country, zielgruppe, acc_new=False, log=False, norm=False):
+    '''
+    Canonical filter of a Timeline figure: the order of the target groups does not matter and selecting all of
+    them is the same as "Select All" (None). The data version is a string, as the key also goes through the browser.
+    '''
+    if zielgruppe is None:
+        zielgruppe = []
+    elif type(zielgruppe) != list:
+        zielgruppe = [zielgruppe]
+    selected = frozenset(zielgruppe)
+    groups = None if selected == frozenset(data_store.get('zielgruppen')) else tuple(sorted(selected))
+    return str(data_store.version()), country, groups, bool(acc_new), bool(log), bool(norm)
 
-    return fig
+
+def timeline_key_from_json(data):
+    version, country, groups, acc_new, log, norm = data
+    return version, country, None if groups is None else tuple(groups), acc_new, log, norm
+
+
+def cached_timeline_figure(key):
+    '''
+    The Timeline figure of main_figure for a timeline_key, cached per key.
+    '''
+    _, country, groups, acc_new, log, norm = key
+    zielgruppe = data_store.get('zielgruppen') if groups is None else list(groups)
+    return timeline_figures.get(key, lambda: main_figure(country=country, zielgruppe=zielgruppe, acc_new=acc_new,
+                                                         log=log, norm=norm))
+
+
+def figure_patch(previous, figure):
+    '''
+    A dash.Patch turning the previous figure into figure, replacing only the trace properties and layout entries
+    that differ. Both figures must have the same number of traces.
+    '''
+    patch = dash.Patch()
+    for index, (previous_trace, trace) in enumerate(zip(previous['data'], figure['data'])):
+        for name in previous_trace.keys() - trace.keys():
+            del patch['data'][index][name]
+        for name, value in trace.items():
+            if previous_trace.get(name) != value:
+                patch['data'][index][name] = value
+    for name in previous['layout'].keys() - figure['layout'].keys():
+        del patch['layout'][name]
+    for name, value in figure['layout'].items():
+        if previous['layout'].get(name) != value:
+            patch['layout'][name] = value
+    return patch
+
+
+def previous_timeline_figure(previous_key):
+    '''
+    The cached figure of previous_key or None. After a patch of "Log" only the figure with the other y-axis type may
+    be cached, which differs from it in just that.
+    '''
+    previous = timeline_figures.peek(previous_key)
+    if previous is None:
+        previous = timeline_figures.peek(previous_key[:4] + (not previous_key[4],) + previous_key[5:])
+        if previous is not None:
+            previous['layout']['yaxis']['type'] = 'log' if previous_key[4] else 'linear'
+    return previous
+
+
+def timeline_update(previous_key, key):
+    '''
+    What to send for the Timeline when the browser shows the figure of previous_key: a patch of the y-axis type if
+    only "Log" was toggled, a patch of the changed properties if the figures have the same traces, else the figure.
+    '''
+    if previous_key is not None and previous_key[:4] == key[:4] and previous_key[5] == key[5]:
+        patch = dash.Patch()
+        patch['layout']['yaxis']['type'] = 'log' if key[4] else 'linear'
+        return patch
+
+    figure = cached_timeline_figure(key)
+    # Only this worker's cache is asked, the browser may have got the previous figure from another worker.
+    previous = None if previous_key is None or previous_key[0] != key[0] else previous_timeline_figure(previous_key)
+    if previous is None or len(previous['data']) != len(figure['data']):
+        return figure
+    return figure_patch(previous, figure)
+
+
+@server.route('/metrics/timeline-cache')
+def timeline_cache_metrics():
+    # Per worker process, the pid tells the gunicorn workers apart.
+    return flask.jsonify(pid=os.getpid(), **timeline_figures.stats())
 
 
 # def create_bar():
@@ -514,124 +963,218 @@ def create_figure(bubble_for_each_county):
 #     )
 #     return fig
 
-dropdown_bundesland = dcc.Dropdown(
-    id='bundesland',
-    options=[{
-        "label": i,
-        "value": i
-    } for i in relevant_countries],
-    value='Bayern',
-    # multi=True
-)
-
-dropdown_zielgruppe = dcc.Dropdown(
-    id='zielgruppe',
-    options=[{
-        "label": i,
-        "value": i
-    } for i in df_zielgruppe],
-    value='Versammlungen',
-    multi=True
-)
-
-
-
-
-check_list = dcc.Checklist(id='checkboxes', options=[{'label': 'Select All', 'value': 'select_all'},
-                                                     {'label': 'Accumulate', 'value': 'accumulate'},
-                                                     {'label': 'Log', 'value': 'log'},
-                                                     {'label': 'Per 100.000','value':'normalized'}],
-                           value=[])
-
-fig = main_figure(country="Bayern", zielgruppe="Versammlungen")
-plot = dcc.Graph(id='Timeline', figure=fig)
-
-
-app.layout = html.Div(id="container", children=[
-    html.Div(id="container_left", children=[
-        build_modal_info_overlay('indicator', 'bottom', dedent(help_text)),
-        html.Img(
-                        id='show-indicator-modal',
-                        src="assets/question.png",
-                        n_clicks=0,
-                        className='info-icon',
-                    ),
-        html.H1(children='''
-            Spatial Overview
-            ''', id='header2'),
-        daq.ToggleSwitch(
-            id='county-country-switch',
-            label='Bundesland/Landkreis',
-            labelPosition='bottom'
-        ),
-        dcc.Graph(
-            id='map',
-            figure=create_figure(False)
-        ),
-        html.Div(id='click-data')
-    ]),
-
-    html.Div(id="container_right", children=[
-        html.H1(children='''
-            Timeline of Events in Germany
-            ''', id='header'),
-        dropdown_bundesland,
-        dropdown_zielgruppe,
-        check_list,
-        plot
+def build_layout(countries, zielgruppen, days):
+    '''
+    The page without any figures, those are filled in by the callbacks once the page is loaded.
+    '''
+    dropdown_bundesland = dcc.Dropdown(
+        id='bundesland',
+        options=[{
+            "label": i,
+            "value": i
+        } for i in countries],
+        value='Bayern',
+        # multi=True
+    )
+
+    dropdown_zielgruppe = dcc.Dropdown(
+        id='zielgruppe',
+        options=[{
+            "label": i,
+            "value": i
+        } for i in zielgruppen],
+        value='Versammlungen',
+        multi=True
+    )
+
+    check_list = dcc.Checklist(id='checkboxes', options=[{'label': 'Select All', 'value': 'select_all'},
+                                                         {'label': 'Accumulate', 'value': 'accumulate'},
+                                                         {'label': 'Log', 'value': 'log'},
+                                                         {'label': 'Per 100.000','value':'normalized'}],
+                               value=[])
+
+    plot = dcc.Graph(id='Timeline')
+
+    return html.Div(id="container", children=[
+        html.Div(id="container_left", children=[
+            build_modal_info_overlay('indicator', 'bottom', dedent(help_text)),
+            html.Img(
+                            id='show-indicator-modal',
+                            src="assets/question.png",
+                            n_clicks=0,
+                            className='info-icon',
+                        ),
+            html.H1(children='''
+                Spatial Overview
+                ''', id='header2'),
+            daq.ToggleSwitch(
+                id='county-country-switch',
+                label='Bundesland/Landkreis',
+                labelPosition='bottom'
+            ),
+            dcc.Graph(id='map'),
+            # Shows the last day first, the map gets the data of another day only once it is selected.
+            dcc.Slider(id='map-day', min=0, max=max(len(days) - 1, 0), step=1, value=max(len(days) - 1, 0),
+                       marks=map_day_marks(days)),
+            # Playing moves the slider one day per tick, each day reaches the map as a patch like a selected one.
+            html.Button('Play', id='map-play', n_clicks=0),
+            dcc.Interval(id='map-play-interval', interval=MAP_PLAY_INTERVAL_MS, disabled=True),
+            html.Div(id='click-data')
+        ]),
+
+        html.Div(id="container_right", children=[
+            html.H1(children='''
+                Timeline of Events in Germany
+                ''', id='header'),
+            dropdown_bundesland,
+            dropdown_zielgruppe,
+            check_list,
+            plot,
+            # The filter key of the figure the browser shows, Timeline updates are patches against it.
+            dcc.Store(id='timeline-state')
+        ])
     ])
-])
 
 
-@app.callback(
+def serve_layout():
+    cube = data_store.get('state_cube')
+    return build_layout(cube.states, data_store.get('zielgruppen'), cube.days)
+
+
+# Dash validates the callbacks against this skeleton, instead of calling serve_layout (and loading all data)
+# when the module is imported.
+app.validation_layout = build_layout([], [], [])
+app.layout = serve_layout
+
+# The layout changes with the data and with this module.
+layout_code_version = file_signature(__file__)
+
+
+def layout_etag():
+    return '{}-{}-{}'.format(data_store.version(), *layout_code_version)
+
+
+@server.before_request
+def layout_not_modified():
+    '''
+    Answers 304 Not Modified to a request of the layout if the browser has the one of the current data, without
+    loading the data or building the layout.
+    '''
+    if flask.request.path != app.config.routes_pathname_prefix + '_dash-layout':
+        return None
+    etag = layout_etag()
+    # Compress appends the encoding to the ETag of compressed responses, e.g. "<etag>:br".
+    for tag in flask.request.if_none_match.as_set():
+        if tag.split(':')[0] == etag:
+            not_modified = server.response_class(status=304)
+            not_modified.set_etag(tag)
+            return not_modified
+    flask.g.layout_etag = etag
+    return None
+
+
+@server.after_request
+def add_layout_etag(response):
+    # Runs before Compress, which registered its after_request first.
+    if 'layout_etag' in flask.g and response.status_code == 200:
+        response.set_etag(flask.g.layout_etag)
+        response.headers['Cache-Control'] = 'no-cache'
+    return response
+
+
+# Runs in the browser, a click on the map only reaches the server through the Timeline update it triggers.
+app.clientside_callback(
+    """
+    function display_click_data(click_data) {
+        if (!click_data) {
+            return window.dash_clientside.no_update;
+        }
+        return click_data.points[0].text;
+    }
+    """,
     Output('bundesland', 'value'),
     [Input('map', 'clickData')])
-def display_click_data(click_data):
-    if click_data is not None:
-        return click_data['points'][0]['customdata'][0]
-    else:
-        return dash.no_update
+
+
+# Runs in the browser, only the day the slider moves to reaches the server.
+app.clientside_callback(
+    """
+    function play_map(n_clicks, n_intervals, day, last_day, paused) {
+        const no_update = window.dash_clientside.no_update;
+        const triggered = window.dash_clientside.callback_context.triggered.map(t => t.prop_id);
+        if (triggered.includes('map-play.n_clicks')) {
+            if (!paused) {
+                return [no_update, true, 'Play'];
+            }
+            // Playing from the last day starts over at the first one.
+            return [day >= last_day ? 0 : no_update, false, 'Pause'];
+        }
+        if (day >= last_day) {
+            return [no_update, true, 'Play'];
+        }
+        return [day + 1, no_update, no_update];
+    }
+    """,
+    [Output('map-day', 'value'), Output('map-play-interval', 'disabled'), Output('map-play', 'children')],
+    [Input('map-play', 'n_clicks'), Input('map-play-interval', 'n_intervals')],
+    [State('map-day', 'value'), State('map-day', 'max'), State('map-play-interval', 'disabled')],
+    prevent_initial_call=True)
 
 
 @app.callback(
     dash.dependencies.Output('map', 'figure'),
-    [dash.dependencies.Input('county-country-switch', 'value')])
-def update_output(value):
-    if value is None:
-        return dash.no_update
-    else:
-        return create_figure(value)
+    [dash.dependencies.Input('county-country-switch', 'value'),
+     dash.dependencies.Input('map-day', 'value')])
+def update_output(value, day_index):
+    # The switch starts without a value, which shows the Bundesländer.
+    bubble_for_each_county = bool(value)
+    if dash.callback_context.triggered_id == 'map-day':
+        return map_day_patch(bubble_for_each_county, day_index)
+    figure = cached_map_figure(bubble_for_each_county)
+    if day_index is None or day_index == len(data_store.get('state_cube').days) - 1:
+        return figure
+    day = typed_arrays(map_day(map_points(bubble_for_each_county), day_index))
+    trace = figure['data'][0]
+    trace['customdata'] = day['customdata']
+    trace['hovertemplate'] = day['hovertemplate']
+    trace['marker']['size'] = day['marker.size']
+    return figure
 
 
-@app.callback(Output("Timeline", "figure"),
+@app.callback([Output("Timeline", "figure"), Output("timeline-state", "data")],
               [Input("bundesland", "value"),
                Input("zielgruppe", "value"),
                Input("checkboxes", "value"),
                Input("zielgruppe", "options"),
-               ])
-def filter_plot(bundesland, zielgruppe, check_list, all_zielgruppe):
+               ],
+              [State("timeline-state", "data")])
+def filter_plot(bundesland, zielgruppe, check_list, all_zielgruppe, previous_key):
     select_all = 'select_all' in check_list
     acc_new = 'accumulate' in check_list
     log = 'log' in check_list
     norm ='normalized' in check_list
     if select_all:
-        all_zielgruppe = [i['value'] for i in all_zielgruppe]
-        figure = main_figure(country=bundesland, zielgruppe=all_zielgruppe, acc_new=acc_new, log=log, norm=norm)
-    else:
-        figure = main_figure(country=bundesland, zielgruppe=zielgruppe, acc_new=acc_new, log=log, norm=norm)
-
-    return figure
+        zielgruppe = [i['value'] for i in all_zielgruppe]
+    key = timeline_key(country=bundesland, zielgruppe=zielgruppe, acc_new=acc_new, log=log, norm=norm)
+    if previous_key is not None:
+        previous_key = timeline_key_from_json(previous_key)
+    return timeline_update(previous_key, key), list(key)
 
 
-@app.callback([Output(f"indicator-modal", 'style'), Output(f"container_left", 'style')],
-                      [Input(f'show-indicator-modal', 'n_clicks'),
-                       Input(f'close-indicator-modal', 'n_clicks')])
-def toggle_modal(n_show, n_close):
-    ctx = dash.callback_context
-    if ctx.triggered and ctx.triggered[0]['prop_id'].startswith('show-'):
-        return {"display": "block"}, {'zIndex': 1003}
-    else:
-        return {"display": "none"}, {'zIndex': 0}
+# Only flips styles, so it runs in the browser.
+app.clientside_callback(
+    """
+    function toggle_modal(n_show, n_close) {
+        const triggered = window.dash_clientside.callback_context.triggered;
+        if (triggered.length && triggered[0].prop_id.startsWith('show-')) {
+            return [{"display": "block"}, {"zIndex": 1003}];
+        }
+        return [{"display": "none"}, {"zIndex": 0}];
+    }
+    """,
+    [Output(f"indicator-modal", 'style'), Output(f"container_left", 'style')],
+    [Input(f'show-indicator-modal', 'n_clicks'),
+     Input(f'close-indicator-modal', 'n_clicks')])
 
 
 if __name__ == '__main__':
@@ -0,0 +1,82 @@
+"""
+Times build_am_data against the former builder with five traces per action, on the shipped actions repeated up to
+the given numbers of actions. Reports the server build time (traces and figure JSON) and the JSON size.
+Run from the frontend directory:
+
+    python benchmarks/action_markers.py [actions ...]
+"""
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+import plotly.graph_objects as go
+
+sys.path.insert(0, '.')
+from application import ZG_WINTER_HOLYDAYS, am_effect_delay, build_am_data, data_store, \
+    wrap_hover_text  # noqa: E402
+
+reference_hover_template = """
+<b>%{{text}}</b><br>
+{details_action} <br><br>
+<i>Vom {start_date} bis vorauss. {end_date}</i>
+<extra></extra>
+"""
+
+
+def build_am_data_loop(df_cases, action_data):
+    # The implementation build_am_data replaced, kept as reference.
+    action_data.index = list(range(1, len(action_data) + 1))
+    max_cases = max(df_cases['infected']) / len(action_data)
+    action_data = action_data.sort_values("startdate_action")
+    data = []
+    for row_num, action in action_data.iterrows():
+        hovertemplate = reference_hover_template.format(
+            details_action=wrap_hover_text(action["details_action"]),
+            start_date=action["startdate_action"].strftime("%d.%m.%Y"),
+            end_date=action["enddate_action"].strftime("%d.%m.%Y"))
+        color = "blue" if action["Zielgruppe"] == ZG_WINTER_HOLYDAYS else "green"
+        start, end = action["startdate_action"], action["enddate_action"]
+        data += [
+            go.Scatter(x=[start, start], y=[max_cases * row_num, 0], mode="lines",
+                       line=dict(color="rgb(200,200,200)")),
+            go.Scatter(x=[start + am_effect_delay, start + am_effect_delay], y=[max_cases * row_num, 0],
+                       mode="lines", line=dict(color="rgb(200,200,200)")),
+            go.Scatter(x=[start, start + am_effect_delay], y=[max_cases * row_num, max_cases * row_num],
+                       marker={"size": 16, "symbol": "triangle-down", "color": "rgb(220,220,220)"},
+                       mode="lines+markers", name="bla", hovertemplate=hovertemplate,
+                       text=[action["action"] + "<br> Beginn", ""], textposition="bottom center"),
+            go.Scatter(x=[start + am_effect_delay, end], y=[max_cases * row_num, max_cases * row_num],
+                       marker={"size": 16, "symbol": "triangle-down", "color": color}, mode="lines+markers",
+                       text=[action["action"] + "<br>mögl. Effekt", action["action"] + "<br>vorraus. Ende"],
+                       textposition="bottom center", hovertemplate=hovertemplate),
+            go.Scatter(x=[start + am_effect_delay, end + am_effect_delay],
+                       y=[max_cases * row_num, max_cases * row_num], marker={"color": color}, mode="lines"),
+        ]
+    return data
+
+
+def measure(builder, df_cases, df_actions, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        figure_json = go.Figure(data=builder(df_cases.copy(), df_actions.copy())).to_json()
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(figure_json)
+
+
+if __name__ == '__main__':
+    counts = [int(count) for count in sys.argv[1:]] or [100, 1000, 5000]
+    df_cases = data_store.get('state_cube').timeline('Bayern')
+    df_shipped = pd.concat([data_store.get('actions'), data_store.get('events')], ignore_index=True)
+
+    print(f"{'actions':>8}{'traces':>8}{'loop [s]':>10}{'loop [MB]':>11}{'traces':>8}{'vectorized [s]':>16}"
+          f"{'vectorized [MB]':>17}{'speedup':>9}")
+    for count in counts:
+        df_actions = df_shipped.iloc[np.arange(count) % len(df_shipped)].reset_index(drop=True)
+        repeats = 1 if count > 1000 else 3
+        loop_time, loop_size = measure(build_am_data_loop, df_cases, df_actions, repeats)
+        vectorized_time, vectorized_size = measure(build_am_data, df_cases, df_actions, 3)
+        n_traces = len(build_am_data(df_cases.copy(), df_actions.copy()))
+        print(f"{count:>8}{count * 5:>8}{loop_time:>10.2f}{loop_size / 2 ** 20:>11.2f}{n_traces:>8}"
+              f"{vectorized_time:>16.3f}{vectorized_size / 2 ** 20:>17.2f}{loop_time / vectorized_time:>9.1f}")
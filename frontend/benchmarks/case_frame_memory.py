@@ -0,0 +1,63 @@
+"""
+Compares the wide cases frame (object strings, int64 counts, coordinates on every row) with the compact one of
+etl.parse_cases_csv: deep memory usage and the per-county groupby the app runs on it.
+
+The scale factor repeats the shipped data set with shifted timestamps. Run from the frontend directory:
+
+    python benchmarks/case_frame_memory.py [scale ...]
+"""
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, '.')
+from etl import CASES_PATH, parse_cases_csv  # noqa: E402
+
+
+def scaled(df, scale):
+    copies = [df.assign(timestamp=df['timestamp'] + pd.Timedelta(days=i * 365)) for i in range(scale)]
+    return pd.concat(copies, ignore_index=True)
+
+
+def wide_frame(scale):
+    df = pd.read_csv(CASES_PATH)
+    df['timestamp'] = pd.to_datetime(df['timestamp'], format='%Y-%m-%dT%H:%M:%S.%fZ', utc=True)
+    return scaled(df, scale)
+
+
+def compact_frame(scale):
+    df, county_table = parse_cases_csv(CASES_PATH)
+    df = scaled(df, scale)
+    # concat keeps the categoricals only because all copies share the categories.
+    assert df['county'].dtype == 'category'
+    return df, county_table
+
+
+def best_of(function, repeats=5):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        function()
+        timings.append(time.perf_counter() - start)
+    return min(timings)
+
+
+def mib(n_bytes):
+    return n_bytes / 2 ** 20
+
+
+if __name__ == '__main__':
+    scales = [int(scale) for scale in sys.argv[1:]] or [1, 10, 100]
+    print(f"{'scale':>6}{'rows':>10}{'wide [MB]':>12}{'compact [MB]':>14}"
+          f"{'groupby wide [ms]':>19}{'groupby codes [ms]':>20}")
+    for scale in scales:
+        df_wide = wide_frame(scale)
+        df_compact, county_table = compact_frame(scale)
+        compact_bytes = df_compact.memory_usage(deep=True).sum() + county_table.memory_usage(deep=True).sum()
+
+        metrics = ['deaths', 'infected']
+        wide_time = best_of(lambda: df_wide.groupby('county')[metrics].cumsum())
+        codes_time = best_of(lambda: df_compact.groupby(df_compact['county'].cat.codes)[metrics].cumsum())
+        print(f"{scale:>6}{len(df_wide):>10}{mib(df_wide.memory_usage(deep=True).sum()):>12.2f}"
+              f"{mib(compact_bytes):>14.2f}{wide_time * 1000:>19.2f}{codes_time * 1000:>20.2f}")
@@ -0,0 +1,53 @@
+"""
+Compares a cold load of the cases data from the CSV with a load of the county/day arrays the app reads.
+
+Every measurement runs in a fresh interpreter, so neither path profits from work done by the other. The arrays are
+read completely, not only mapped, so both paths end with the case data in memory.
+Run from the frontend directory:
+
+    python benchmarks/cases_cache.py [repeats]
+"""
+import json
+import subprocess
+import sys
+
+MEASURE = """
+import json, resource, sys, time
+sys.path.insert(0, '.')
+import numpy as np
+from etl import CASES_PATH, CountyDayArrays, parse_cases_csv
+
+if sys.argv[1] == 'arrays':
+    start = time.perf_counter()
+    arrays = CountyDayArrays.load()
+    daily, cumulative = np.array(arrays.daily), np.array(arrays.cumulative)
+    duration = time.perf_counter() - start
+    data_bytes = daily.nbytes + cumulative.nbytes
+else:
+    start = time.perf_counter()
+    df, county_table = parse_cases_csv(CASES_PATH)
+    duration = time.perf_counter() - start
+    data_bytes = df.memory_usage(deep=True).sum() + county_table.memory_usage(deep=True).sum()
+print(json.dumps({'seconds': duration, 'data_bytes': int(data_bytes),
+                  'max_rss_kb': resource.getrusage(resource.RUSAGE_SELF).ru_maxrss}))
+"""
+
+
+def measure(source, repeats):
+    runs = [json.loads(subprocess.check_output([sys.executable, '-c', MEASURE, source]))
+            for _ in range(repeats)]
+    runs.sort(key=lambda run: run['seconds'])
+    return runs[len(runs) // 2]
+
+
+if __name__ == '__main__':
+    sys.path.insert(0, '.')
+    import etl
+    etl.run()  # make sure the arrays are up to date
+
+    repeats = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    print(f"{'source':<10}{'load [ms]':>12}{'data [MB]':>12}{'max RSS [MB]':>14}")
+    for source in ['csv', 'arrays']:
+        result = measure(source, repeats)
+        print(f"{source:<10}{result['seconds'] * 1000:>12.1f}{result['data_bytes'] / 2 ** 20:>12.2f}"
+              f"{result['max_rss_kb'] / 1024:>14.1f}")
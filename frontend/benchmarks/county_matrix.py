@@ -0,0 +1,91 @@
+"""
+Times build_county_day_matrix against the former itertools.product loop of create_figure on synthetic RKI rows.
+
+The scale factor multiplies the number of reported days (1x is roughly the shipped data: ~400 counties, 53 days).
+Run from the frontend directory:
+
+    python benchmarks/county_matrix.py [scale ...]
+"""
+import itertools
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, '.')
+from etl import build_county_day_matrix  # noqa: E402
+
+COUNTIES = 400
+DAYS = 53
+REPORTS_PER_COUNTY_DAY = 0.4
+
+
+def synthetic_rows(scale, seed=0):
+    random = np.random.default_rng(seed)
+    days = pd.date_range('2020-01-28', periods=DAYS * scale)
+    days = days.strftime('%Y-%m-%dT%H:%M:%S.%f').str[:-3] + "Z"
+    n_rows = int(COUNTIES * len(days) * REPORTS_PER_COUNTY_DAY)
+    county_index = random.integers(0, COUNTIES, n_rows)
+    return pd.DataFrame({
+        'county': [f'LK {i:03d}' for i in county_index],
+        'country': [f'Land {i % 16:02d}' for i in county_index],
+        'lat': 47 + county_index / COUNTIES * 8,
+        'lon': 6 + county_index / COUNTIES * 9,
+        'timestamp': np.asarray(days)[random.integers(0, len(days), n_rows)],
+        'infected': random.integers(1, 20, n_rows),
+        'deaths': random.integers(0, 2, n_rows),
+    })
+
+
+def build_county_day_matrix_loop(df_uncompleted):
+    # The implementation create_figure used before, kept as reference.
+    county_day_map = {}
+    county_to_country_lat_lon = {}
+    for row in df_uncompleted[['county', 'country', 'lat', 'lon', 'timestamp', 'infected', 'deaths']].values.tolist():
+        county_day_map[(row[0], row[4])] = row
+        if row[0] not in county_to_country_lat_lon:
+            county_to_country_lat_lon[row[0]] = row[1:4]
+
+    unique_days = df_uncompleted['timestamp'].unique()
+    unique_days.sort()
+    filled_unique_days = pd.date_range(unique_days[0], unique_days[-1])
+    filled_unique_days = filled_unique_days.map(lambda x: (x.strftime('%Y-%m-%dT%H:%M:%S.%f')))
+    filled_unique_days = filled_unique_days.map(lambda x: x[:-3] + "Z")
+    unique_counties = df_uncompleted['county'].unique()
+    unique_counties.sort()
+
+    full_matrix = []
+    for day, county in itertools.product(filled_unique_days, unique_counties):
+        if (county, day) in county_day_map:
+            full_matrix.append(county_day_map[(county, day)])
+        else:
+            full_matrix.append([county] + county_to_country_lat_lon[county] + [day] + [0, 0])
+
+    df = pd.DataFrame(data=full_matrix,
+                      columns=['county', 'country', 'lat', 'lon', 'timestamp', 'infected', 'deaths'])
+    df = df.sort_values(by=['county', 'timestamp'], ascending=[True, True])
+    return df.groupby(by=['timestamp', 'county', 'lat', 'lon', 'country'])[['deaths', 'infected']].sum().reset_index(). \
+        sort_values(by=['country', 'timestamp'], ascending=[True, True])
+
+
+def best_of(function, argument, repeats):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function(argument)
+        timings.append(time.perf_counter() - start)
+    return min(timings), result
+
+
+if __name__ == '__main__':
+    scales = [int(scale) for scale in sys.argv[1:]] or [1, 10, 100]
+    print(f"{'scale':>6}{'rows':>10}{'cells':>10}{'loop [s]':>12}{'vectorized [s]':>16}{'speedup':>10}")
+    for scale in scales:
+        df_uncompleted = synthetic_rows(scale)
+        loop_time, expected = best_of(build_county_day_matrix_loop, df_uncompleted, 1 if scale > 10 else 3)
+        vectorized_time, result = best_of(build_county_day_matrix, df_uncompleted, 3)
+        pd.testing.assert_frame_equal(result.reset_index(drop=True), expected.reset_index(drop=True),
+                                      check_dtype=False)
+        print(f"{scale:>6}{len(df_uncompleted):>10}{len(result):>10}{loop_time:>12.3f}{vectorized_time:>16.3f}"
+              f"{loop_time / vectorized_time:>10.1f}")
@@ -0,0 +1,60 @@
+"""
+Times the Timeline figure assembled through plotly.graph_objects (build_am_data and merge_figures) against the plain
+dict of build_am_traces and merge_figure_dicts for growing numbers of actions, without and with the JSON encoding Dash
+does (to_json_plotly). Both must serialize to the same JSON. Run from the frontend directory:
+
+    python benchmarks/figure_assembly.py [actions ...]
+"""
+import sys
+import time
+
+import numpy as np
+import plotly.graph_objects as go
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, '.')
+from application import build_am_data, build_am_traces, build_merged_dataset, create_timeline, data_store, \
+    merge_figure_dicts, merge_figures  # noqa: E402
+
+
+def validated_figure(df_cases, df_actions, df_merged):
+    bar_charts = [go.Bar(x=df_merged['Time'], y=df_merged['infected'], name='Bayern', marker_color='#3a1261')]
+    return merge_figures(bar_charts, build_am_data(df_cases, df_actions), False)
+
+
+def dict_figure(df_cases, df_actions, df_merged):
+    bar_trace = {'marker': {'color': '#3a1261'}, 'name': 'Bayern', 'x': df_merged['Time'].to_numpy(dtype=object),
+                 'y': df_merged['infected'].to_numpy(), 'type': 'bar'}
+    return merge_figure_dicts(bar_trace, build_am_traces(df_cases, df_actions), False)
+
+
+def best_of(function, arguments, repeats):
+    build_timings, total_timings = [], []
+    for _ in range(repeats):
+        copies = [argument.copy() for argument in arguments]
+        start = time.perf_counter()
+        figure = function(*copies)
+        built = time.perf_counter()
+        figure_json = to_json_plotly(figure)
+        build_timings.append(built - start)
+        total_timings.append(time.perf_counter() - start)
+    return min(build_timings), min(total_timings), figure_json
+
+
+if __name__ == '__main__':
+    counts = [int(count) for count in sys.argv[1:]] or [10, 100, 1000, 5000]
+    df_cases = data_store.get('state_cube').timeline('Bayern')
+    df_shipped = data_store.get('action_index').actions
+
+    print(f"{'':>8}{'graph_objects [ms]':>20}{'dict [ms]':>20}{'speedup':>16}")
+    print(f"{'actions':>8}{'build':>10}{'+json':>10}{'build':>10}{'+json':>10}{'build':>8}{'+json':>8}")
+    for count in counts:
+        df_actions = df_shipped.iloc[np.arange(count) % len(df_shipped)].reset_index(drop=True)
+        df_merged = build_merged_dataset(df_cases, create_timeline(df_cases.copy(), df_actions))
+        repeats = 1 if count > 1000 else 5
+        validated_build, validated_total, expected = best_of(validated_figure, [df_cases, df_actions, df_merged],
+                                                             repeats)
+        dict_build, dict_total, result = best_of(dict_figure, [df_cases, df_actions, df_merged], repeats)
+        assert result == expected, f'{count} actions: figures differ'
+        print(f"{count:>8}{validated_build * 1000:>10.1f}{validated_total * 1000:>10.1f}{dict_build * 1000:>10.1f}"
+              f"{dict_total * 1000:>10.1f}{validated_build / dict_build:>8.1f}{validated_total / dict_total:>8.1f}")
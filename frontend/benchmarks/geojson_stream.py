@@ -0,0 +1,79 @@
+"""
+Peak memory of reading RKI GeoJSON dumps of growing size, streamed by etl.read_reported_cases against json.load.
+
+Synthetic dumps with the given numbers of features are written to a temporary directory, every read runs in a
+fresh interpreter. Run from the frontend directory:
+
+    python benchmarks/geojson_stream.py [features ...]
+"""
+import json
+import os
+import subprocess
+import sys
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, '.')
+from etl import COUNTY_MARKERS_PATH, read_county_markers  # noqa: E402
+
+MEASURE = """
+import json, resource, sys, time
+sys.path.insert(0, '.')
+import etl
+
+method, path = sys.argv[1:]
+baseline = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+start = time.perf_counter()
+if method == 'stream':
+    df = etl.read_reported_cases(path, etl.COUNTY_MARKERS_PATH)
+else:
+    with open(path) as json_file:
+        features = [feature['properties'] for feature in json.load(json_file)['features']]
+    df = etl.aggregate_reported_cases(features, etl.read_county_markers(etl.COUNTY_MARKERS_PATH))
+duration = time.perf_counter() - start
+peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+print(json.dumps({'seconds': duration, 'peak_kb': peak - baseline, 'rows': len(df)}))
+"""
+
+
+def write_dump(path, n_features, seed=0):
+    random = np.random.default_rng(seed)
+    county_ids = sorted(read_county_markers(COUNTY_MARKERS_PATH))
+    days = pd.date_range('2020-01-28', periods=365).strftime('%Y-%m-%dT00:00:00.000Z')
+    with open(path, 'w', encoding='utf-8') as fid:
+        fid.write('{"type":"FeatureCollection","features":[')
+        for object_id in range(n_features):
+            county_id = county_ids[object_id % len(county_ids)]
+            properties = {
+                "IdBundesland": 1, "Bundesland": "Bundesland", "Landkreis": f"LK {county_id}",
+                "Altersgruppe": "A35-A59", "Geschlecht": "M", "AnzahlFall": int(random.integers(1, 5)),
+                "AnzahlTodesfall": 0, "ObjectId": object_id, "Meldedatum": days[object_id % len(days)],
+                "IdLandkreis": county_id,
+            }
+            if object_id:
+                fid.write(',')
+            fid.write(json.dumps({"type": "Feature", "properties": properties, "geometry": None},
+                                 ensure_ascii=False))
+        fid.write(']}')
+
+
+def measure(method, path):
+    return json.loads(subprocess.check_output([sys.executable, '-c', MEASURE, method, path]))
+
+
+if __name__ == '__main__':
+    sizes = [int(size) for size in sys.argv[1:]] or [10000, 100000, 1000000]
+    print(f"{'features':>10}{'file [MB]':>11}{'json.load peak [MB]':>21}{'stream peak [MB]':>18}"
+          f"{'json.load [s]':>15}{'stream [s]':>12}")
+    with tempfile.TemporaryDirectory() as directory:
+        for size in sizes:
+            path = os.path.join(directory, f'dump_{size}.geojson')
+            write_dump(path, size)
+            loaded = measure('load', path)
+            streamed = measure('stream', path)
+            assert loaded['rows'] == streamed['rows']
+            print(f"{size:>10}{os.path.getsize(path) / 2 ** 20:>11.1f}{loaded['peak_kb'] / 1024:>21.1f}"
+                  f"{streamed['peak_kb'] / 1024:>18.1f}{loaded['seconds']:>15.2f}{streamed['seconds']:>12.2f}")
+            os.remove(path)
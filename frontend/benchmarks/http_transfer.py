@@ -0,0 +1,75 @@
+"""
+Bytes transferred and server time of the biggest responses of the Dash server and the backend API, uncompressed,
+with gzip, with brotli, and revalidated with the ETag of an earlier response (304 Not Modified where supported).
+The time is measured through the test clients, so without the network; the transfer column adds the time the
+bytes take over a link of the given speed. Run from the frontend directory:
+
+    python benchmarks/http_transfer.py [Mbit/s]
+"""
+import sys
+import time
+
+sys.path.insert(0, '.')
+sys.path.insert(0, '../backend')
+import api  # noqa: E402
+from application import data_store, server  # noqa: E402
+
+ENCODINGS = [('identity', {}), ('gzip', {'Accept-Encoding': 'gzip'}), ('br', {'Accept-Encoding': 'br, gzip'})]
+
+
+def callback(output, outputs, inputs, state=()):
+    return {'output': output, 'outputs': outputs, 'inputs': inputs, 'state': list(state), 'changedPropIds': []}
+
+
+def best_of(request, repeats=10):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        response = request()
+        timings.append(time.perf_counter() - start)
+    return min(timings), response
+
+
+if __name__ == '__main__':
+    mbit_per_second = float(sys.argv[1]) if len(sys.argv) > 1 else 10
+    dash_client = server.test_client()
+    api_client = api.app.test_client()
+    # Loaded by the first graph, like the other component suites it is cached by the browser for a year.
+    plotly_js = '/_dash-component-suites/plotly/package_data/plotly.min.js'
+    map_callback = callback('map.figure', {'id': 'map', 'property': 'figure'},
+                            [{'id': 'county-country-switch', 'property': 'value', 'value': True},
+                             {'id': 'map-day', 'property': 'value', 'value': None}])
+    timeline_callback = callback(
+        '..Timeline.figure...timeline-state.data..',
+        [{'id': 'Timeline', 'property': 'figure'}, {'id': 'timeline-state', 'property': 'data'}],
+        [{'id': 'bundesland', 'property': 'value', 'value': 'Bayern'},
+         {'id': 'zielgruppe', 'property': 'value', 'value': data_store.get('zielgruppen')},
+         {'id': 'checkboxes', 'property': 'value', 'value': []},
+         {'id': 'zielgruppe', 'property': 'options', 'value': []}],
+        [{'id': 'timeline-state', 'property': 'data', 'value': None}])
+    last_day = api_client.get('/map/landkreis').json['days'][-1]
+    requests = [
+        ('plotly.js', lambda headers: dash_client.get(plotly_js, headers=headers)),
+        ('Dash layout', lambda headers: dash_client.get('/_dash-layout', headers=headers)),
+        ('Landkreis map', lambda headers: dash_client.post('/_dash-update-component', json=map_callback,
+                                                           headers=headers)),
+        ('Select All', lambda headers: dash_client.post('/_dash-update-component', json=timeline_callback,
+                                                        headers=headers)),
+        ('API markers', lambda headers: api_client.get('/map/landkreis', headers=headers)),
+        ('API day', lambda headers: api_client.get(f'/map/landkreis/{last_day}', headers=headers)),
+    ]
+
+    print(f"{'response':<15}{'encoding':<12}{'status':>7}{'bytes':>10}{'server [ms]':>13}"
+          f"{f'+ {mbit_per_second:g} Mbit/s [ms]':>22}")
+    for name, request in requests:
+        for encoding, headers in ENCODINGS:
+            server_time, response = best_of(lambda: request(headers))
+            rows = [(encoding, server_time, response)]
+            etag = response.headers.get('ETag')
+            if encoding == 'br' and etag:
+                rows.append(('revalidate', *best_of(lambda: request(dict(headers, **{'If-None-Match': etag})))))
+            for label, server_time, response in rows:
+                size = len(response.get_data())
+                transfer_time = server_time + size * 8 / (mbit_per_second * 1e6)
+                print(f"{name:<15}{label:<12}{response.status_code:>7}{size:>10}{server_time * 1000:>13.2f}"
+                      f"{transfer_time * 1000:>22.1f}")
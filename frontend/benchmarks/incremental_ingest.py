@@ -0,0 +1,104 @@
+"""
+Cost of etl.py --incremental against the number of changed records, next to a full rebuild of the same dump.
+
+A synthetic dump with the given number of features is ingested once, then copies of it with a growing number of
+changed records are ingested one after the other into a temporary directory. Parsing the dump grows with its
+size, every dump holds the whole history; diffing the records, updating the arrays and saving grow with the change.
+Run from the frontend directory:
+
+    python benchmarks/incremental_ingest.py [features] [changed ...]
+"""
+import json
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, '.')
+import etl  # noqa: E402
+
+
+def write_dump(path, records, county_ids, days):
+    with open(path, 'w', encoding='utf-8') as fid:
+        fid.write('{"type":"FeatureCollection","features":[')
+        for position, (object_id, county, day, infected) in enumerate(records.tolist()):
+            properties = {
+                "IdBundesland": 1, "Bundesland": "Bundesland", "Landkreis": f"LK {county_ids[county]}",
+                "Altersgruppe": "A35-A59", "Geschlecht": "M", "AnzahlFall": infected, "AnzahlTodesfall": 0,
+                "ObjectId": object_id, "Meldedatum": days[day], "IdLandkreis": county_ids[county],
+            }
+            if position:
+                fid.write(',')
+            fid.write(json.dumps({"type": "Feature", "properties": properties, "geometry": None},
+                                 ensure_ascii=False))
+        fid.write(']}')
+
+
+def ingest(index_path, dump_path, state_path, county_to_middles):
+    '''
+    The seconds of every phase of etl.ingest_county_day_arrays.
+    '''
+    seconds = {}
+    start = time.perf_counter()
+    state = etl.IngestState.load(state_path)
+    arrays = etl.CountyDayArrays.load(index_path) if state.generation is not None else None
+    records = state.read_dump(etl.iter_features(dump_path), county_to_middles)
+    seconds['parse'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    subtracted, added, _ = state.apply(records)
+    seconds['diff'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    updated = etl.apply_record_deltas(arrays, state, subtracted, added, county_to_middles)
+    seconds['arrays'] = time.perf_counter() - start
+
+    start = time.perf_counter()
+    state.generation = updated.save(index_path)
+    state.save(state_path)
+    seconds['save'] = time.perf_counter() - start
+    return seconds
+
+
+def full_build(directory, dump_path):
+    start = time.perf_counter()
+    csv_path = os.path.join(directory, 'full.csv')
+    etl.build_cases_csv(csv_path, dump_path, etl.COUNTY_MARKERS_PATH)
+    etl.build_county_day_arrays(os.path.join(directory, 'full_index.json'), csv_path)
+    return time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    n_features = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    changes = [int(changed) for changed in sys.argv[2:]] or [1, 100, 10000, n_features // 2]
+    random = np.random.default_rng(0)
+    county_to_middles = etl.read_county_markers(etl.COUNTY_MARKERS_PATH)
+    county_ids = sorted(county_to_middles)
+    days = pd.date_range('2020-01-28', periods=365).strftime('%Y-%m-%dT00:00:00.000Z').tolist()
+    records = np.rec.fromarrays([np.arange(n_features), random.integers(0, len(county_ids), n_features),
+                                 random.integers(0, len(days), n_features), random.integers(1, 5, n_features)])
+
+    with tempfile.TemporaryDirectory() as directory:
+        dump_path = os.path.join(directory, 'dump.geojson')
+        index_path = os.path.join(directory, 'county_day_index.json')
+        state_path = os.path.join(directory, 'ingest_state.json')
+        write_dump(dump_path, records, county_ids, days)
+        ingest(index_path, dump_path, state_path, county_to_middles)
+
+        print(f"{n_features} features, {os.path.getsize(dump_path) / 2 ** 20:.1f} MB")
+        print(f"{'changed':>10}{'parse [s]':>11}{'diff [ms]':>11}{'arrays [ms]':>13}{'save [ms]':>11}"
+              f"{'full build [s]':>16}")
+        for changed in changes:
+            rows = random.choice(n_features, changed, replace=False)
+            records.f3[rows] += 1
+            write_dump(dump_path, records, county_ids, days)
+            seconds = ingest(index_path, dump_path, state_path, county_to_middles)
+            full_seconds = full_build(directory, dump_path)
+            incremental = etl.CountyDayArrays.load(index_path)
+            assert np.array_equal(incremental.cumulative,
+                                  etl.CountyDayArrays.load(os.path.join(directory, 'full_index.json')).cumulative)
+            print(f"{changed:>10}{seconds['parse']:>11.2f}{seconds['diff'] * 1000:>11.1f}"
+                  f"{seconds['arrays'] * 1000:>13.1f}{seconds['save'] * 1000:>11.1f}{full_seconds:>16.2f}")
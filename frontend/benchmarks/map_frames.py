@@ -0,0 +1,90 @@
+"""
+Compares the map of create_figure, which holds one day and gets other days as patches, with the animated
+px.scatter_mapbox figure holding all days it replaced: JSON size and build time of the initial figure per map mode,
+with and without the counties that never report a case, and the size of a day patch. Every day must show the same
+bubbles as the frame of that day. Run from the frontend directory:
+
+    python benchmarks/map_frames.py
+"""
+import sys
+import time
+
+import numpy as np
+import orjson
+import plotly.express as px
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, '.')
+from application import create_figure, data_store, map_day_patch  # noqa: E402
+
+
+def create_figure_px(bubble_for_each_county):
+    # The implementation create_figure used before, kept as reference.
+    germany_center = {'lat': 51.133481, 'lon': 10.018343}
+    if not bubble_for_each_county:
+        country_to_middles = data_store.get('state_markers')
+        df = data_store.get('state_cube').to_frame(accumulated=True)
+        df['lat'] = df['country'].map(lambda x: country_to_middles[x][0])
+        df['lon'] = df['country'].map(lambda x: country_to_middles[x][1])
+        df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d')
+        fig = px.scatter_mapbox(df, lat='lat', lon='lon', size="infected", size_max=40, mapbox_style='stamen-toner',
+                                animation_frame='timestamp', height=800, hover_data=['country', 'infected', 'deaths'],
+                                custom_data=['country'], center=germany_center, zoom=4.9)
+    else:
+        df = data_store.get('county_arrays').to_frame(accumulated=True)
+        df['timestamp'] = df['timestamp'].dt.strftime('%Y-%m-%d')
+        fig = px.scatter_mapbox(df, lat='lat', lon='lon', size="infected", mapbox_style='stamen-toner',
+                                animation_frame='timestamp', height=800,
+                                hover_data=['country', 'county', 'infected', 'deaths'],
+                                custom_data=['country', 'county'], center=germany_center, zoom=4.9)
+    fig.layout['clickmode'] = 'event+select'
+    fig.layout['uirevision'] = 'x'
+    return fig
+
+
+def coordinates(trace):
+    # create_figure sends float32 coordinates.
+    return np.float32(trace['lat']).tolist(), np.float32(trace['lon']).tolist()
+
+
+def px_bubbles(frame):
+    trace = frame['data'][0]
+    return sorted(zip(*coordinates(trace), [tuple(row[:-2]) for row in trace['customdata']],
+                      trace['marker']['size'], [row[-1] for row in trace['customdata']]))
+
+
+def day_bubbles(figure):
+    trace = figure['data'][0]
+    names = zip(trace['text'], trace['hovertext']) if 'hovertext' in trace else ((text,) for text in trace['text'])
+    return sorted((lat, lon, name, size, deaths) for lat, lon, name, size, deaths
+                  in zip(*coordinates(trace), names, trace['marker']['size'], trace['customdata'])
+                  if size or deaths)
+
+
+def timed(function, *arguments):
+    start = time.perf_counter()
+    figure_json = to_json_plotly(function(*arguments))
+    return time.perf_counter() - start, figure_json
+
+
+if __name__ == '__main__':
+    print(f"{'mode':<12}{'px [MB]':>9}{'px [s]':>8}{'day [MB]':>10}{'[s]':>7}{'omit zero [MB]':>16}{'[s]':>7}"
+          f"{'patch [kB]':>12}")
+    for bubble_for_each_county, mode in [(False, 'Bundesland'), (True, 'Landkreis')]:
+        px_time, px_json = timed(create_figure_px, bubble_for_each_county)
+        day_time, day_json = timed(create_figure, bubble_for_each_county)
+        sparse_time, sparse_json = timed(create_figure, bubble_for_each_county, -1, True)
+        patch_json = to_json_plotly(map_day_patch(bubble_for_each_county, 0))
+
+        expected = orjson.loads(px_json)
+        assert np.isclose(orjson.loads(day_json)['data'][0]['marker']['sizeref'],
+                          expected['data'][0]['marker']['sizeref'])
+        for day_index, frame in enumerate(expected['frames']):
+            # Bubbles without cases are invisible, they may be left out.
+            bubbles = [bubble for bubble in px_bubbles(frame) if bubble[3] or bubble[4]]
+            for omit_zero in [False, True]:
+                figure = orjson.loads(to_json_plotly(create_figure(bubble_for_each_county, day_index, omit_zero)))
+                assert day_bubbles(figure) == bubbles
+
+        print(f"{mode:<12}{len(px_json) / 2 ** 20:>9.2f}{px_time:>8.2f}{len(day_json) / 2 ** 20:>10.3f}"
+              f"{day_time:>7.3f}{len(sparse_json) / 2 ** 20:>16.3f}{sparse_time:>7.3f}{len(patch_json) / 1000:>12.1f}")
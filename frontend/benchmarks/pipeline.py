@@ -0,0 +1,219 @@
+"""
+Benchmark suite of the data and figure pipeline of application.py: every stage on its own (reading, filtering, the
+timeline, the action markers, merging) and end to end (main_figure and create_figure, also serialized like the
+callbacks send them), on the data set scaled by factors: each scale copies every county and every action that many
+times.
+
+Every scale runs in a fresh process on a copy of the data, so the data of the repository is never touched and the
+data store starts empty. A stage is called once to warm up and then timed repeatedly, each call on fresh copies of
+its inputs and with the garbage collector off, like timeit. The stages take turns, and a fixed calibration workload
+takes its turn with them; its time relative to the baseline rescales the baseline, which takes out most of the drift
+of a shared machine. The medians are compared: there, a single lucky call makes the best time of the calibration,
+but not of every stage, jump. The baseline in benchmarks/pipeline_baseline.json is recorded with --save and only
+comparable on the machine it was recorded on. Without --save, the script exits with 1 if the median of a stage got
+slower than its baseline by more than the threshold (and by more than 0.1 ms, below which the timings are noise).
+Run from the frontend directory:
+
+    python benchmarks/pipeline.py [--scales 1 4] [--repeats 30] [--threshold 0.5] [--save]
+"""
+import argparse
+import gc
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+FRONTEND_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+REPO_DIR = os.path.dirname(FRONTEND_DIR)
+BASELINE_PATH = os.path.join(FRONTEND_DIR, 'benchmarks', 'pipeline_baseline.json')
+# Below this difference a stage is never reported as a regression.
+NOISE_SECONDS = 1e-4
+CALIBRATION = 'calibration'
+
+STATE = 'Bayern'
+ZIELGRUPPE = ['Versammlungen']
+
+
+def write_scaled_data(root, scale):
+    '''
+    The data directories of the repository under root, with every county and action copied scale times. Copies of a
+    county are named "<county> (2)" and so on and placed a bit off the original.
+    '''
+    for directory in ['data-cases', 'data-actions', 'frontend']:
+        os.makedirs(os.path.join(root, directory))
+    for directory in ['county_centers', 'assets']:
+        os.symlink(os.path.join(FRONTEND_DIR, directory), os.path.join(root, 'frontend', directory))
+    for path in ['data-cases/inhabitants_per_state.xlsx', 'data-actions/Winterferien2019-20.csv']:
+        shutil.copy(os.path.join(REPO_DIR, path), os.path.join(root, path))
+
+    df_cases = pd.read_csv(os.path.join(REPO_DIR, 'data-cases', 'data_set.csv'), dtype={'timestamp': str})
+    copies = []
+    for copy in range(scale):
+        df_copy = df_cases.copy()
+        if copy:
+            df_copy['county'] += f' ({copy + 1})'
+            df_copy[['lat', 'lon']] += 0.01 * copy
+        copies.append(df_copy)
+    df_scaled = pd.concat(copies, ignore_index=True).sort_values('timestamp', kind='stable')
+    df_scaled.to_csv(os.path.join(root, 'data-cases', 'data_set.csv'), index=False)
+
+    actions_path = 'data-actions/policymeasures - measures_taken.csv'
+    df_actions = pd.read_csv(os.path.join(REPO_DIR, actions_path))
+    pd.concat([df_actions] * scale, ignore_index=True).to_csv(os.path.join(root, actions_path), index=False)
+
+
+def stages(application):
+    '''
+    Per stage, a function returning fresh arguments and the function to time.
+    '''
+    import plotly.graph_objects as go
+    from plotly.io.json import to_json_plotly
+
+    a = application
+    df_cases, df_actions = a.filter_data_set(country=STATE, zielgruppe_filter=ZIELGRUPPE)
+    zielgruppen = a.data_store.get('zielgruppen')
+    county_arrays = a.data_store.get('county_arrays')
+    df_merged = a.build_merged_dataset(df_cases, a.create_timeline(df_cases.copy(), df_actions))
+    bar_figure = [go.Bar(x=df_merged['Time'], y=df_merged['infected'], name='Bayern', marker_color='#3a1261')]
+    am_figure = a.build_am_data(df_cases, df_actions.copy())
+    return {
+        # What the data store reads when the case data changed.
+        'CountyDayArrays.load': (lambda: (), a.CountyDayArrays.load),
+        'StateCube.from_county_arrays': (lambda: (county_arrays,), a.StateCube.from_county_arrays),
+        'read_action_data': (lambda: (), a.read_action_data),
+        'filter_data_set': (lambda: (None, STATE, ZIELGRUPPE), a.filter_data_set),
+        'create_timeline': (lambda: (df_cases.copy(), df_actions), a.create_timeline),
+        'build_am_data': (lambda: (df_cases, df_actions.copy()), a.build_am_data),
+        'merge_figures': (lambda: (bar_figure, am_figure, False), a.merge_figures),
+        'main_figure': (lambda: (STATE, ZIELGRUPPE), a.main_figure),
+        'main_figure(all zielgruppen)': (lambda: (STATE, zielgruppen), a.main_figure),
+        'create_figure(False)': (lambda: (False,), a.create_figure),
+        'create_figure(True)': (lambda: (True,), a.create_figure),
+        # What the callbacks send on a cache miss.
+        'main_figure, serialized': (lambda: (STATE, ZIELGRUPPE),
+                                    lambda *key: to_json_plotly(a.typed_arrays(a.main_figure(*key)))),
+        'create_figure(True), serialized': (lambda: (True,),
+                                            lambda bubble: to_json_plotly(a.typed_arrays(a.create_figure(bubble)))),
+    }
+
+
+def calibration():
+    '''
+    A fixed mix of pandas, numpy and Python work, its time tracks the speed of the machine at the moment.
+    '''
+    rng = np.random.default_rng(0)
+    df = pd.DataFrame({'county': rng.integers(0, 400, 100_000), 'infected': rng.integers(0, 100, 100_000)})
+    df.groupby('county')['infected'].cumsum()
+    np.sort(rng.random(200_000))
+    json.dumps([{'day': day, 'infected': day * 2} for day in range(20_000)])
+
+
+def timed(function, arguments):
+    call_arguments = arguments()
+    gc.disable()
+    start = time.perf_counter()
+    function(*call_arguments)
+    seconds = time.perf_counter() - start
+    gc.enable()
+    return seconds
+
+
+def measure(repeats):
+    '''
+    The best and the median time of every stage and of the calibration in seconds, run in the frontend directory of
+    a scaled copy.
+    '''
+    sys.path.insert(0, FRONTEND_DIR)
+    import etl
+
+    etl.build_county_day_arrays(etl.COUNTY_DAY_INDEX_PATH, etl.CASES_PATH)
+    import application
+
+    timed_stages = {CALIBRATION: (lambda: (), calibration), **stages(application)}
+    for arguments, stage in timed_stages.values():
+        stage(*arguments())
+    calls = {name: [] for name in timed_stages}
+    # Round robin over the stages, so a change of the speed of the machine affects all of them alike.
+    for _ in range(repeats):
+        for name, (arguments, stage) in timed_stages.items():
+            calls[name].append(timed(stage, arguments))
+    return {name: {'best': min(seconds), 'median': float(np.median(seconds))} for name, seconds in calls.items()}
+
+
+def measure_scale(scale, repeats):
+    with tempfile.TemporaryDirectory() as root:
+        write_scaled_data(root, scale)
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), '--measure', f'--repeats={repeats}'],
+                                cwd=os.path.join(root, 'frontend'), capture_output=True, text=True)
+    if result.returncode:
+        sys.exit(f'Scale {scale} failed:\n{result.stderr}')
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def compare(scale, timings, baseline, threshold):
+    '''
+    Prints the timings of a scale next to the baseline, returns the names of the stages which regressed.
+
+    The baseline is scaled by how much slower or faster the calibration ran than when it was recorded, so a busy or
+    throttled machine does not show as a regression of every stage.
+    '''
+    regressions = []
+    speed = timings[CALIBRATION]['median'] / baseline[CALIBRATION]['median'] if CALIBRATION in baseline else 1
+    print(f"scale {scale}, machine speed {1 / speed:.2f} of the baseline")
+    print(f"  {'stage':<34}{'best [ms]':>11}{'median [ms]':>13}{'baseline [ms]':>15}{'change':>9}")
+    for name, timing in timings.items():
+        line = f"  {name:<34}{timing['best'] * 1000:>11.2f}{timing['median'] * 1000:>13.2f}"
+        if name in baseline and name != CALIBRATION:
+            median = baseline[name]['median'] * speed
+            change = timing['median'] / median - 1
+            regressed = change > threshold and timing['median'] - median > NOISE_SECONDS
+            line += f"{median * 1000:>15.2f}{change:>+9.0%}{'  regression' if regressed else ''}"
+            if regressed:
+                regressions.append(name)
+        print(line)
+    return regressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--scales', type=int, nargs='+', default=[1, 4], help='copies of every county and action')
+    parser.add_argument('--repeats', type=int, default=30, help='timed calls of every stage')
+    parser.add_argument('--threshold', type=float, default=0.5,
+                        help='slowdown of the median against the baseline that fails the run, 0.5 is 50%%')
+    parser.add_argument('--save', action='store_true', help=f'record the timings as baseline in {BASELINE_PATH}')
+    parser.add_argument('--measure', action='store_true', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        print(json.dumps(measure(args.repeats)))
+        sys.exit()
+
+    if os.path.exists(BASELINE_PATH):
+        with open(BASELINE_PATH) as fid:
+            baseline = json.load(fid)
+    else:
+        baseline = {'machine': None, 'scales': {}}
+    results = {scale: measure_scale(scale, args.repeats) for scale in args.scales}
+
+    if args.save:
+        baseline['machine'] = f'{platform.node()}, {platform.processor() or platform.machine()}, ' \
+                              f'Python {platform.python_version()}, pandas {pd.__version__}'
+        baseline['scales'].update({str(scale): timings for scale, timings in results.items()})
+        with open(BASELINE_PATH, 'w') as fid:
+            json.dump(baseline, fid, indent=2)
+            fid.write('\n')
+
+    print(f"Baseline recorded on {baseline['machine']}")
+    regressions = []
+    for scale, timings in results.items():
+        regressions += [f'{name} (scale {scale})' for name in compare(
+            scale, timings, {} if args.save else baseline['scales'].get(str(scale), {}), args.threshold)]
+    if regressions:
+        sys.exit('Slower than the baseline: ' + ', '.join(regressions))
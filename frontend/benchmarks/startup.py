@@ -0,0 +1,84 @@
+"""
+Measures how fast the app starts: the import profile of application.py and the wall clock time from spawning a
+server process until it served the page layout and the first map and Timeline figures.
+
+Run from the frontend directory:
+
+    python benchmarks/startup.py [port]
+"""
+import json
+import subprocess
+import sys
+import time
+import urllib.request
+
+SERVE = """
+import sys
+sys.path.insert(0, '.')
+from application import server
+server.run(port=int(sys.argv[1]), threaded=False)
+"""
+
+# The initial callbacks the browser fires for the map and the Timeline.
+INITIAL_CALLBACKS = [
+    {"output": "map.figure", "outputs": {"id": "map", "property": "figure"},
+     "inputs": [{"id": "county-country-switch", "property": "value", "value": None},
+                {"id": "map-day", "property": "value", "value": None}], "changedPropIds": []},
+    {"output": "..Timeline.figure...timeline-state.data..",
+     "outputs": [{"id": "Timeline", "property": "figure"}, {"id": "timeline-state", "property": "data"}],
+     "inputs": [{"id": "bundesland", "property": "value", "value": "Bayern"},
+                {"id": "zielgruppe", "property": "value", "value": "Versammlungen"},
+                {"id": "checkboxes", "property": "value", "value": []},
+                {"id": "zielgruppe", "property": "options", "value": []}],
+     "state": [{"id": "timeline-state", "property": "data", "value": None}], "changedPropIds": []},
+]
+
+
+def import_profile(top=10):
+    output = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import application'],
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        # Nesting is shown by two spaces per level, keep application.py and what it imports directly.
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth <= 1:
+            modules.append((int(cumulative), name.strip()))
+    modules.sort(reverse=True)
+    print('Slowest imports (cumulative):')
+    for cumulative, name in modules[:top]:
+        print(f'  {cumulative / 1000:>8.1f} ms  {name}')
+
+
+def wait_for(url, data=None, timeout=120):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            request = urllib.request.Request(url, data=data, headers={'Content-Type': 'application/json'})
+            with urllib.request.urlopen(request) as response:
+                return response.read()
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            time.sleep(0.01)
+
+
+def time_to_first_requests(port):
+    start = time.perf_counter()
+    process = subprocess.Popen([sys.executable, '-c', SERVE, str(port)], stderr=subprocess.DEVNULL)
+    try:
+        wait_for(f'http://127.0.0.1:{port}/_dash-layout')
+        print(f'First layout served after {time.perf_counter() - start:.2f} s')
+        for callback in INITIAL_CALLBACKS:
+            wait_for(f'http://127.0.0.1:{port}/_dash-update-component', json.dumps(callback).encode())
+            print(f'{callback["output"]} served after {time.perf_counter() - start:.2f} s')
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    import_profile()
+    time_to_first_requests(int(sys.argv[1]) if len(sys.argv) > 1 else 8051)
@@ -0,0 +1,49 @@
+"""
+Payload and server time of the Timeline callback per kind of interaction: the full figure against the update
+timeline_update sends, a dash.Patch where possible. Both start from the figure the browser shows. The server time
+includes the JSON encoding; every figure is in the figure cache before, as for popular views.
+Run from the frontend directory:
+
+    python benchmarks/timeline_patch.py [state]
+"""
+import sys
+import time
+
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, '.')
+from application import cached_timeline_figure, data_store, timeline_key, timeline_update  # noqa: E402
+
+
+def best_of(function, repeats=20):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        payload = to_json_plotly(function())
+        timings.append(time.perf_counter() - start)
+    return min(timings), len(payload)
+
+
+if __name__ == '__main__':
+    state = sys.argv[1] if len(sys.argv) > 1 else 'Bayern'
+    zielgruppen = data_store.get('zielgruppen')
+    shown = dict(country=state, zielgruppe=['Versammlungen'], acc_new=False, log=False, norm=False)
+    interactions = [
+        ('Log', dict(shown, log=True)),
+        ('Accumulate', dict(shown, acc_new=True)),
+        ('Per 100.000', dict(shown, norm=True)),
+        ('Zielgruppe', dict(shown, zielgruppe=['Versammlungen', 'Kinder'])),
+        ('Select All', dict(shown, zielgruppe=zielgruppen)),
+        ('Bundesland', dict(shown, country='Hessen' if state != 'Hessen' else 'Bayern')),
+    ]
+
+    previous_key = timeline_key(**shown)
+    cached_timeline_figure(previous_key)
+    print(f"{'interaction':<14}{'full [kB]':>11}{'update [kB]':>13}{'full [ms]':>11}{'update [ms]':>13}")
+    for name, filters in interactions:
+        key = timeline_key(**filters)
+        cached_timeline_figure(key)
+        full_time, full_size = best_of(lambda: cached_timeline_figure(key))
+        update_time, update_size = best_of(lambda: timeline_update(previous_key, key))
+        print(f"{name:<14}{full_size / 1000:>11.1f}{update_size / 1000:>13.1f}{full_time * 1000:>11.2f}"
+              f"{update_time * 1000:>13.2f}")
@@ -0,0 +1,61 @@
+"""
+JSON size and encoding time of the figures the callbacks send, with numeric arrays as JSON numbers against base64
+typed arrays (typed_arrays). The typed figure must hold the same values. Run from the frontend directory:
+
+    python benchmarks/wire_encoding.py [state]
+"""
+import base64
+import sys
+import time
+
+import numpy as np
+import orjson
+from plotly.io.json import to_json_plotly
+
+sys.path.insert(0, '.')
+from application import create_figure, data_store, main_figure, map_day, map_points, typed_arrays  # noqa: E402
+
+
+def decoded(figure):
+    # What plotly.js reads from a typed array, as plain JSON data.
+    if isinstance(figure, dict):
+        if 'bdata' in figure:
+            values = np.frombuffer(base64.b64decode(figure['bdata']), dtype='<' + figure['dtype'])
+            if 'shape' in figure:
+                values = values.reshape([int(length) for length in figure['shape'].split(',')])
+            return orjson.loads(to_json_plotly(values))
+        return {name: decoded(value) for name, value in figure.items()}
+    if isinstance(figure, list):
+        return [decoded(value) for value in figure]
+    return figure
+
+
+def best_of(function, repeats=20):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        payload = function()
+        timings.append(time.perf_counter() - start)
+    return min(timings), payload
+
+
+if __name__ == '__main__':
+    state = sys.argv[1] if len(sys.argv) > 1 else 'Bayern'
+    zielgruppen = data_store.get('zielgruppen')
+    figures = [
+        ('Bundesland map', lambda: create_figure(False)),
+        ('Landkreis map', lambda: create_figure(True)),
+        ('Landkreis day', lambda: map_day(map_points(True), 0)),
+        ('Timeline', lambda: main_figure(state, ['Versammlungen'], False, False, False)),
+        ('Select All', lambda: main_figure(state, zielgruppen, False, False, False)),
+    ]
+
+    print(f"{'figure':<16}{'JSON [kB]':>11}{'typed [kB]':>12}{'JSON [ms]':>11}{'typed [ms]':>12}")
+    for name, build in figures:
+        figure = build()
+        plain_time, plain_json = best_of(lambda: to_json_plotly(figure))
+        typed_time, typed_json = best_of(lambda: to_json_plotly(typed_arrays(figure)))
+        # Coordinates are float32 already before the encoding, so both hold the same values.
+        assert decoded(orjson.loads(typed_json)) == orjson.loads(plain_json)
+        print(f"{name:<16}{len(plain_json) / 1000:>11.1f}{len(typed_json) / 1000:>12.1f}{plain_time * 1000:>11.2f}"
+              f"{typed_time * 1000:>12.2f}")
@@ -0,0 +1,68 @@
+"""
+Total memory of the gunicorn master and its workers after every worker served the map and the Timeline.
+
+RSS counts pages shared between processes once per process, PSS splits them between the processes sharing them,
+so the PSS sum is what the server really occupies. Linux only. Run from the frontend directory:
+
+    python benchmarks/worker_memory.py [workers ...]
+"""
+import json
+import os
+import subprocess
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(__file__))
+from startup import INITIAL_CALLBACKS, wait_for  # noqa: E402
+
+PORT = 8052
+LANDKREIS_MAP = {"output": "map.figure", "outputs": {"id": "map", "property": "figure"},
+                 "inputs": [{"id": "county-country-switch", "property": "value", "value": True},
+                            {"id": "map-day", "property": "value", "value": None}],
+                 "changedPropIds": ["county-country-switch.value"]}
+
+
+def children(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as fid:
+        return [int(child) for child in fid.read().split()]
+
+
+def memory_kb(pid):
+    usage = {}
+    with open(f'/proc/{pid}/smaps_rollup') as fid:
+        for line in fid:
+            key, _, value = line.partition(':')
+            if key in ('Rss', 'Pss'):
+                usage[key] = int(value.split()[0])
+    return usage
+
+
+def measure(n_workers):
+    process = subprocess.Popen([sys.executable, '-m', 'gunicorn', '--config=gunicorn.conf.py', f'--workers={n_workers}',
+                                f'--bind=127.0.0.1:{PORT}', 'application:server'],
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        wait_for(f'http://127.0.0.1:{PORT}/_dash-layout')
+        # Requests are spread over the workers by the kernel, send enough that each worker loaded the data.
+        for _ in range(8 * n_workers):
+            for callback in INITIAL_CALLBACKS + [LANDKREIS_MAP]:
+                request = urllib.request.Request(f'http://127.0.0.1:{PORT}/_dash-update-component',
+                                                 data=json.dumps(callback).encode(),
+                                                 headers={'Content-Type': 'application/json'})
+                urllib.request.urlopen(request).read()
+        time.sleep(0.5)
+        pids = [process.pid] + children(process.pid)
+        usages = [memory_kb(pid) for pid in pids]
+        return len(pids) - 1, sum(usage['Rss'] for usage in usages), sum(usage['Pss'] for usage in usages)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    counts = [int(count) for count in sys.argv[1:]] or [1, 6, 12]
+    print(f"{'workers':>8}{'total RSS [MB]':>16}{'total PSS [MB]':>16}{'PSS per worker [MB]':>21}")
+    for count in counts:
+        workers, rss, pss = measure(count)
+        print(f"{workers:>8}{rss / 1024:>16.1f}{pss / 1024:>16.1f}{pss / 1024 / workers:>21.1f}")
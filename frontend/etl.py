@@ -0,0 +1,553 @@
+# -*- coding: utf-8 -*-
+"""
+Builds the derived datasets of the app out of the RKI dump and the county markers.
+
+Run from the frontend directory before starting the app, e.g. after downloading a new RKI dump:
+
+    python etl.py [--force] [--incremental]
+
+Like make, a step only runs if one of its inputs is newer than its output. Outputs are written under a temporary
+name and renamed into place, so the web workers never see a half written file.
+"""
+import argparse
+import json
+import os
+import re
+import uuid
+from contextlib import contextmanager
+
+import numpy as np
+import pandas as pd
+
+GEOJSON_PATH = r'../data-cases/RKI_COVID19.geojson'
+COUNTY_MARKERS_PATH = r'./county_centers/landkreise_marker.json'
+CASES_PATH = r'../data-cases/data_set.csv'
+INGEST_STATE_PATH = r'../data-cases/ingest_state.json'
+COUNTY_DAY_INDEX_PATH = r'../data-cases/county_day_index.json'
+
+# Whitespace and commas between two features of the GeoJSON features array.
+SEPARATORS = re.compile(r'[\s,]*')
+
+
+@contextmanager
+def atomic_write(path):
+    '''
+    Yields a temporary path next to path, which replaces path once the block finished without an error.
+    '''
+    # Unique across processes and containers, which may all run the ETL on the same mounted repository.
+    tmp_path = f'{path}.{uuid.uuid4().hex}.tmp'
+    try:
+        yield tmp_path
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def is_outdated(target, inputs):
+    if not os.path.exists(target):
+        return True
+    target_mtime = os.stat(target).st_mtime_ns
+    return any(os.stat(path).st_mtime_ns > target_mtime for path in inputs)
+
+
+def iter_features(path, chunk_size=64 * 1024):
+    '''
+    Yields the properties of every feature of a GeoJSON FeatureCollection while reading the file chunk by chunk.
+
+    Only the current chunk and the feature being decoded are held in memory, whatever the size of the file.
+    '''
+    decoder = json.JSONDecoder()
+    with open(path, encoding='utf-8') as fid:
+        buffer = ''
+        # Skip everything up to the opening bracket of the features array.
+        while True:
+            key = buffer.find('"features"')
+            start = buffer.find('[', key) if key != -1 else -1
+            if start != -1:
+                break
+            chunk = fid.read(chunk_size)
+            if not chunk:
+                raise ValueError(f'{path} contains no features array')
+            # Keep the key, or the tail which might be its beginning.
+            buffer = (buffer[key:] if key != -1 else buffer[-len('"features"'):]) + chunk
+        position = start + 1
+
+        while True:
+            position = SEPARATORS.match(buffer, position).end()
+            if buffer.startswith(']', position):
+                return
+            try:
+                feature, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # The feature continues in the next chunk.
+                chunk = fid.read(chunk_size)
+                if not chunk:
+                    raise
+                buffer = buffer[position:] + chunk
+                position = 0
+                continue
+            yield feature['properties']
+
+
+def aggregate_reported_cases(features, county_to_middles):
+    '''
+    Sums infected and deaths per county and day while consuming the features, so memory grows with the number of
+    county-days and not with the number of features. Returns one row per reported county and day.
+    '''
+    counts = {}
+    counties = {}
+    for case in features:
+        county_id = case['IdLandkreis']
+        if county_id not in county_to_middles:
+            # We have no geocoords for this county, therefore throwing out.
+            continue
+        key = (county_id, case['Meldedatum'])
+        if key in counts:
+            counts[key][0] += case['AnzahlFall']
+            counts[key][1] += case['AnzahlTodesfall']
+        else:
+            counts[key] = [case['AnzahlFall'], case['AnzahlTodesfall']]
+        if county_id not in counties:
+            counties[county_id] = (case['Landkreis'], case['Bundesland'])
+
+    return reported_cases_frame(counts, counties, county_to_middles)
+
+
+def reported_cases_frame(counts, counties, county_to_middles):
+    '''
+    One row per (IdLandkreis, Meldedatum) of counts, with the names and coordinates of the county.
+    '''
+    rows = []
+    for (county_id, timestamp), (infected, deaths) in counts.items():
+        county, country = counties[county_id]
+        lat, lon = tuple(county_to_middles[county_id])
+        rows.append([county, country, lat, lon, timestamp, infected, deaths])
+    return pd.DataFrame(data=rows, columns=['county', 'country', 'lat', 'lon', 'timestamp', 'infected', 'deaths'])
+
+
+class IngestState:
+    '''
+    Everything ingested from RKI dumps so far: every record as a row of a structured array sorted by ObjectId, the
+    counties the records refer to by code, and the generation of the county/day arrays built from these records.
+
+    RKI republishes the whole history every day. apply diffs the records of a new dump against the stored ones
+    and returns only those which were added, changed or removed, whose counts are then applied to the arrays as
+    deltas. The records are stored as a plain .npy file, which is mapped instead of deserialized on load and
+    written with a single write on save.
+    '''
+    record_dtype = np.dtype([('object_id', np.int64), ('county', np.int32), ('day', np.int32),
+                             ('infected', np.int32), ('deaths', np.int32)])
+
+    def __init__(self, records=None, counties=None, generation=None):
+        # Sorted by object_id, day counts days since 1970-01-01, county is a position in counties.
+        self.records = np.zeros(0, dtype=self.record_dtype) if records is None else records
+        # [IdLandkreis, Landkreis, Bundesland] per county code
+        self.counties = counties or []
+        self.generation = generation
+
+    @classmethod
+    def load(cls, path=INGEST_STATE_PATH):
+        if not os.path.exists(path):
+            return cls()
+        with open(path, encoding='utf-8') as fid:
+            state = json.load(fid)
+        records = np.load(os.path.join(os.path.dirname(path), state['records']), mmap_mode='r')
+        return cls(records, state['counties'], state['generation'])
+
+    def records_path(self, path):
+        return f'{os.path.splitext(path)[0]}.{self.generation}.npy'
+
+    def save(self, path=INGEST_STATE_PATH):
+        '''
+        Writes the records under the name of the generation, then the state naming them, then removes the records
+        of the previous state.
+        '''
+        previous = self.load(path) if os.path.exists(path) else None
+        with atomic_write(self.records_path(path)) as tmp_path:
+            with open(tmp_path, 'wb') as fid:
+                np.save(fid, self.records)
+        with atomic_write(path) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as fid:
+                json.dump({'generation': self.generation, 'records': os.path.basename(self.records_path(path)),
+                           'counties': self.counties}, fid, ensure_ascii=False)
+        if previous is not None and previous.generation != self.generation:
+            os.remove(previous.records_path(path))
+
+    def read_dump(self, features, county_to_middles):
+        '''
+        The records of a complete dump, sorted by ObjectId. Counties seen for the first time are added to counties.
+        '''
+        county_codes = {county_id: code for code, (county_id, _, _) in enumerate(self.counties)}
+        day_numbers = {}
+        rows = []
+        for case in features:
+            county_id = case['IdLandkreis']
+            if county_id not in county_to_middles:
+                # We have no geocoords for this county, therefore throwing out.
+                continue
+            code = county_codes.get(county_id)
+            if code is None:
+                code = county_codes[county_id] = len(self.counties)
+                self.counties.append([county_id, case['Landkreis'], case['Bundesland']])
+            day = day_numbers.get(case['Meldedatum'])
+            if day is None:
+                day = day_numbers[case['Meldedatum']] = int(np.datetime64(case['Meldedatum'][:10], 'D').astype(int))
+            rows.append((case['ObjectId'], code, day, case['AnzahlFall'], case['AnzahlTodesfall']))
+        records = np.array(rows, dtype=self.record_dtype)
+        return records[np.argsort(records['object_id'], kind='stable')]
+
+    def apply(self, records):
+        '''
+        Makes the state match the records of a complete dump. Returns the stored records whose counts have to be
+        subtracted from the sums, the new records whose counts have to be added, and the numbers of added, changed
+        and removed records.
+        '''
+        previous = self.records
+        positions = np.searchsorted(previous['object_id'], records['object_id'])
+        positions[positions == len(previous)] = 0
+        known = (previous['object_id'][positions] == records['object_id']) if len(previous) else \
+            np.zeros(len(records), dtype=bool)
+        unchanged = known.copy()
+        for field in ['county', 'day', 'infected', 'deaths']:
+            unchanged[known] &= previous[field][positions[known]] == records[field][known]
+        kept = np.zeros(len(previous), dtype=bool)
+        kept[positions[unchanged]] = True
+        seen = np.zeros(len(previous), dtype=bool)
+        seen[positions[known]] = True
+
+        self.records = records
+        changes = (int((~known).sum()), int((known & ~unchanged).sum()), int((~seen).sum()))
+        return previous[~kept], records[~unchanged], changes
+
+
+def read_county_markers(county_markers_path):
+    with open(county_markers_path) as json_file:
+        return json.load(json_file)
+
+
+def read_reported_cases(geojson_path, county_markers_path):
+    '''
+    Infected and deaths per county and day, as reported in the RKI dump.
+    '''
+    return aggregate_reported_cases(iter_features(geojson_path), read_county_markers(county_markers_path))
+
+
+def build_county_day_matrix(df_uncompleted):
+    '''
+    Completes the reported rows to exactly one row per county and day, days without a report get zero counts.
+
+    Only the last reported row of a county and day is kept. The result is ordered by country and timestamp,
+    which is the layout of data_set.csv.
+    '''
+    county_codes, counties = pd.factorize(df_uncompleted['county'], sort=True)
+    day_codes, reported_days = pd.factorize(df_uncompleted['timestamp'])
+    reported_days = pd.to_datetime(reported_days)
+    days = pd.date_range(reported_days.min(), reported_days.max())
+    day_positions = (reported_days - days[0]).days.to_numpy()[day_codes]
+    # Back to the format of the RKI timestamps, e.g. 2020-03-18T00:00:00.000Z
+    days = np.asarray(days.strftime('%Y-%m-%dT%H:%M:%S.%f').str[:-3] + "Z")
+
+    # Each county and day is one cell of a flattened (days x counties) matrix, the last report of a cell wins.
+    n_cells = len(days) * len(counties)
+    cells = day_positions * len(counties) + county_codes
+    _, last_from_end = np.unique(cells[::-1], return_index=True)
+    rows = len(cells) - 1 - last_from_end
+    cells = cells[rows]
+
+    # Cells without a report take country and coordinates from the first report of the county.
+    first_rows = np.unique(county_codes, return_index=True)[1]
+    cell_county = np.tile(np.arange(len(counties)), len(days))
+    columns = {}
+    for column in ['country', 'lat', 'lon']:
+        values = df_uncompleted[column].to_numpy()
+        columns[column] = values[first_rows][cell_county]
+        columns[column][cells] = values[rows]
+    for column in ['deaths', 'infected']:
+        columns[column] = np.zeros(n_cells, dtype=np.int64)
+        columns[column][cells] = df_uncompleted[column].to_numpy()[rows]
+
+    # Order by country and timestamp, cells of the same country and day stay ordered by county.
+    cell_day = np.repeat(np.arange(len(days)), len(counties))
+    order = np.lexsort((cell_day, pd.factorize(columns['country'], sort=True)[0]))
+    return pd.DataFrame({
+        'timestamp': days[cell_day[order]],
+        'county': np.asarray(counties)[cell_county[order]],
+        'lat': columns['lat'][order],
+        'lon': columns['lon'][order],
+        'country': columns['country'][order],
+        'deaths': columns['deaths'][order],
+        'infected': columns['infected'][order],
+    }, index=order)
+
+
+def parse_cases_csv(path):
+    '''
+    Parses a cases CSV into a compact frame and a side table of the counties.
+
+    The frame holds UTC timestamps, county and country as categoricals and int32 counts. Coordinates are constant
+    per county, so they are kept once in the side table, whose rows are in the order of the county codes.
+    '''
+    df_cases = pd.read_csv(path, dtype={'county': 'category', 'country': 'category',
+                                        'deaths': 'int32', 'infected': 'int32'})
+    df_cases["timestamp"] = pd.to_datetime(df_cases["timestamp"], format='%Y-%m-%dT%H:%M:%S.%fZ', utc=True)
+
+    county_table = df_cases.drop_duplicates(subset=['county']).set_index('county')[['country', 'lat', 'lon']]
+    county_table = county_table.reindex(df_cases['county'].cat.categories)
+    county_table.index = county_table.index.astype(str)
+    return df_cases.drop(columns=['lat', 'lon']), county_table
+
+
+def read_county_day_index(index_path):
+    with open(index_path, encoding='utf-8') as fid:
+        return json.load(fid)
+
+
+def load_county_day_arrays(index_path):
+    '''
+    The index and the memory-mapped daily and cumulative arrays of its generation.
+
+    Raises ValueError if the arrays do not have the shape the index was written for.
+    '''
+    directory = os.path.dirname(index_path)
+    generation = None
+    while True:
+        index = read_county_day_index(index_path)
+        try:
+            daily, cumulative = [np.load(os.path.join(directory, index['arrays'][name]), mmap_mode='r')
+                                 for name in ['daily', 'cumulative']]
+            break
+        except FileNotFoundError:
+            # Retried only if a newer generation replaced the index and removed these arrays meanwhile.
+            if index['generation'] == generation:
+                raise
+            generation = index['generation']
+    shape = (index['shape'][0], len(index['counties']), len(index['metrics']))
+    if daily.shape != shape or cumulative.shape != shape:
+        raise ValueError(f'The arrays of {index_path} have the shapes {daily.shape} and {cumulative.shape} '
+                         f'instead of {shape}, rebuild them with etl.py --force')
+    return index, daily, cumulative
+
+
+class CountyDayArrays:
+    '''
+    Deaths and infected per day and county as arrays of shape (days, counties, metrics), stored as .npy files.
+
+    The web workers map these files read-only, so the case data lives once in the page cache instead of once in
+    every worker process.
+    '''
+    metrics = ['deaths', 'infected']
+
+    def __init__(self, days, counties, countries, lat, lon, daily, cumulative):
+        self.days = days
+        self.counties = counties
+        self.countries = countries
+        self.lat = lat
+        self.lon = lon
+        self.daily = daily
+        self.cumulative = cumulative
+
+    @classmethod
+    def from_cases(cls, df_cases, county_table):
+        timestamps = df_cases['timestamp'].dt.tz_localize(None)
+        days = pd.date_range(timestamps.min(), timestamps.max(), name='timestamp')
+
+        county_index = df_cases['county'].cat.codes.to_numpy()
+        day_index = (timestamps - days[0]).dt.days.to_numpy()
+        daily = np.zeros((len(days), len(county_table), len(cls.metrics)), dtype=np.int32)
+        for metric_index, metric in enumerate(cls.metrics):
+            np.add.at(daily, (day_index, county_index, metric_index), df_cases[metric].to_numpy())
+        return cls(days, county_table.index.tolist(), county_table['country'].astype(str).tolist(),
+                   county_table['lat'].to_numpy(), county_table['lon'].to_numpy(),
+                   daily, np.cumsum(daily, axis=0, dtype=np.int32))
+
+    def save(self, index_path=COUNTY_DAY_INDEX_PATH):
+        '''
+        Writes the arrays of a new generation next to the index, then the index naming them, then removes the
+        arrays of the previous generation.
+
+        A reader always finds the arrays named by the index it read, or none if it read the index of a generation
+        which was removed meanwhile, but never the arrays of another generation.
+        '''
+        directory = os.path.dirname(index_path)
+        previous = read_county_day_index(index_path) if os.path.exists(index_path) else None
+        generation = uuid.uuid4().hex
+        arrays = {name: f'county_day_{name}.{generation}.npy' for name in ['daily', 'cumulative']}
+        for name, values in [('daily', self.daily), ('cumulative', self.cumulative)]:
+            with atomic_write(os.path.join(directory, arrays[name])) as tmp_path:
+                with open(tmp_path, 'wb') as fid:
+                    np.save(fid, values)
+        index = {
+            'generation': generation,
+            'shape': list(self.daily.shape),
+            'arrays': arrays,
+            'first_day': self.days[0].strftime('%Y-%m-%d'),
+            'metrics': self.metrics,
+            'counties': self.counties,
+            'countries': self.countries,
+            'lat': self.lat.tolist(),
+            'lon': self.lon.tolist(),
+        }
+        with atomic_write(index_path) as tmp_path:
+            with open(tmp_path, 'w', encoding='utf-8') as fid:
+                json.dump(index, fid, ensure_ascii=False)
+        for name in (previous or {}).get('arrays', {}).values():
+            try:
+                os.remove(os.path.join(directory, name))
+            except FileNotFoundError:
+                # Removed by another run of the ETL which replaced the same generation.
+                pass
+        return generation
+
+    @classmethod
+    def load(cls, index_path=COUNTY_DAY_INDEX_PATH):
+        index, daily, cumulative = load_county_day_arrays(index_path)
+        days = pd.date_range(index['first_day'], periods=daily.shape[0], name='timestamp')
+        return cls(days, index['counties'], index['countries'], np.array(index['lat']), np.array(index['lon']),
+                   daily, cumulative)
+
+    def to_frame(self, accumulated=False):
+        '''
+        Long format with one row per county and day, ordered by day and county.
+        '''
+        values = self.cumulative if accumulated else self.daily
+        n_days, n_counties = values.shape[:2]
+        df = pd.DataFrame({
+            'timestamp': np.repeat(self.days, n_counties),
+            'county': np.tile(self.counties, n_days),
+            'country': np.tile(self.countries, n_days),
+            'lat': np.tile(self.lat, n_days),
+            'lon': np.tile(self.lon, n_days),
+        })
+        for metric_index, metric in enumerate(self.metrics):
+            df[metric] = values[:, :, metric_index].ravel()
+        return df
+
+
+def build_cases_csv(target, geojson_path, county_markers_path):
+    df = build_county_day_matrix(read_reported_cases(geojson_path, county_markers_path))
+    with atomic_write(target) as tmp_path:
+        df.to_csv(tmp_path, index=False)
+
+
+def apply_record_deltas(arrays, state, subtracted, added, county_to_middles):
+    '''
+    The county/day arrays of the records of state. arrays holds the sums before the records subtracted were removed
+    and the records added were added, or is None to sum all records from scratch.
+
+    Like in the full build, the counties and days are those with at least one record. Unless they changed, only
+    the cells of the given records are touched and the cumulative sums are recomputed from the first changed day.
+    '''
+    records = state.records
+    present = np.flatnonzero(np.bincount(records['county'], minlength=len(state.counties)))
+    # The first code of a county name gives its country and coordinates.
+    codes = {}
+    for code in present:
+        codes.setdefault(state.counties[code][1], code)
+    counties = sorted(codes)
+    column_of = {county: column for column, county in enumerate(counties)}
+    columns = np.full(len(state.counties), -1)
+    columns[present] = [column_of[state.counties[code][1]] for code in present]
+    first_day = int(records['day'].min())
+    days = pd.date_range(np.datetime64(first_day, 'D'), np.datetime64(int(records['day'].max()), 'D'),
+                         name='timestamp')
+
+    unchanged_shape = arrays is not None and arrays.counties == counties and arrays.days.equals(days)
+    if unchanged_shape:
+        daily = np.array(arrays.daily)
+    else:
+        daily = np.zeros((len(days), len(counties), len(CountyDayArrays.metrics)), dtype=np.int32)
+        if arrays is not None:
+            # Carry the sums over, cells of counties and days which are gone have no records left.
+            old_columns = np.array([column_of.get(county, -1) for county in arrays.counties])
+            old_rows = np.arange(len(arrays.days)) + (arrays.days[0] - days[0]).days
+            kept_rows = (old_rows >= 0) & (old_rows < len(days))
+            kept_columns = old_columns >= 0
+            daily[np.ix_(old_rows[kept_rows], old_columns[kept_columns])] = \
+                arrays.daily[np.ix_(kept_rows, kept_columns)]
+
+    first_changed = len(days)
+    for changed, sign in [(subtracted, -1), (added, 1)]:
+        rows = changed['day'] - first_day
+        cells = columns[changed['county']]
+        inside = (cells >= 0) & (rows >= 0) & (rows < len(days))
+        rows, cells, changed = rows[inside], cells[inside], changed[inside]
+        for metric_index, metric in enumerate(CountyDayArrays.metrics):
+            np.add.at(daily, (rows, cells, metric_index), sign * changed[metric])
+        if len(rows):
+            first_changed = min(first_changed, rows.min())
+
+    if unchanged_shape:
+        cumulative = np.array(arrays.cumulative)
+        cumulative[first_changed:] = np.cumsum(daily[first_changed:], axis=0, dtype=np.int32)
+        if 0 < first_changed < len(days):
+            cumulative[first_changed:] += cumulative[first_changed - 1]
+    else:
+        cumulative = np.cumsum(daily, axis=0, dtype=np.int32)
+    county_ids = [state.counties[codes[county]][0] for county in counties]
+    return CountyDayArrays(days, counties, [state.counties[codes[county]][2] for county in counties],
+                           np.array([county_to_middles[county_id][0] for county_id in county_ids]),
+                           np.array([county_to_middles[county_id][1] for county_id in county_ids]),
+                           daily, cumulative)
+
+
+def ingest_county_day_arrays(target, geojson_path, county_markers_path, state_path=INGEST_STATE_PATH):
+    '''
+    Like building data_set.csv and the arrays out of it, but only applies the difference of the dump to the arrays
+    of the previous run. data_set.csv is left as it is.
+    '''
+    county_to_middles = read_county_markers(county_markers_path)
+    state = IngestState.load(state_path)
+    arrays = None
+    if state.generation is not None and os.path.exists(target) and \
+            read_county_day_index(target).get('generation') == state.generation:
+        arrays = CountyDayArrays.load(target)
+    else:
+        # The arrays were rebuilt by a full run since, sum all records of the dump from scratch.
+        state.records = np.zeros(0, dtype=IngestState.record_dtype)
+    subtracted, added, (n_added, n_changed, n_removed) = state.apply(
+        state.read_dump(iter_features(geojson_path), county_to_middles))
+    print(f'Ingested {geojson_path}: {n_added} added, {n_changed} changed, {n_removed} removed records')
+
+    if arrays is None or len(subtracted) or len(added):
+        state.generation = apply_record_deltas(arrays, state, subtracted, added, county_to_middles).save(target)
+        state.save(state_path)
+    else:
+        # Nothing changed, just mark the target as up to date.
+        os.utime(target)
+
+
+def build_county_day_arrays(target, csv_path):
+    CountyDayArrays.from_cases(*parse_cases_csv(csv_path)).save(index_path=target)
+
+
+def steps(incremental=False):
+    '''
+    (target, inputs, build function) of every artifact, in the order they have to run.
+    '''
+    if incremental:
+        return [(COUNTY_DAY_INDEX_PATH, [GEOJSON_PATH, COUNTY_MARKERS_PATH], ingest_county_day_arrays)]
+    return [
+        (CASES_PATH, [GEOJSON_PATH, COUNTY_MARKERS_PATH], build_cases_csv),
+        (COUNTY_DAY_INDEX_PATH, [CASES_PATH], build_county_day_arrays),
+    ]
+
+
+def run(force=False, incremental=False):
+    for target, inputs, build in steps(incremental):
+        if force or is_outdated(target, inputs):
+            print(f'Building {target}')
+            build(target, *inputs)
+        else:
+            print(f'{target} is up to date')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--force', action='store_true', help='rebuild every artifact, even if it is up to date')
+    parser.add_argument('--incremental', action='store_true',
+                        help='diff the RKI dump against the previously ingested one by ObjectId and only apply the '
+                             'changes to the county/day arrays, the ingested records are kept in '
+                             f'{INGEST_STATE_PATH}')
+    args = parser.parse_args()
+    run(force=args.force, incremental=args.incremental)
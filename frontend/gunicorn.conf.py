@@ -0,0 +1,13 @@
+"""
+Settings of the gunicorn server, see DockerfileServer.
+"""
+import etl
+
+workers = 6
+bind = '0.0.0.0:8050'
+
+
+def on_starting(server):
+    # Runs once in the master before any worker is forked. The workers only map the derived arrays read-only,
+    # so they have to exist before the first worker starts.
+    etl.run()